@@ -1,11 +1,28 @@
 import dash
+import os
 import time
 from dash import dcc, html
 from dash.dependencies import Input, Output
 from pages import main, help_page, document, table, table_influence, visualization, statistics
+from config import JOB_WORKERS
+from utils.jobs import start_workers
+from utils.uploads import register_upload_routes
+from utils.telemetry import register_metrics_route
+from utils.lazy import preload_in_background
 
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
+register_upload_routes(server)
+register_metrics_route(server)
+
+COMPONENT_LIBRARIES = ["dash_cytoscape", "dash_daq"]
+
+# Imported off the request path; Dash must register their scripts before it serves the index page.
+component_loader = preload_in_background(*COMPONENT_LIBRARIES)
+
+@server.before_request
+def wait_for_component_libraries():
+    component_loader.join()
 
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
@@ -38,11 +55,11 @@ def display_page(pathname):
     elif pathname == '/table':
         return table.layout
     elif pathname == '/table_influence':
-        return table_influence.layout
+        return table_influence.create_layout()
     elif pathname == '/statistics':
         return statistics.layout
     elif pathname == '/visualization':
-        return visualization.layout
+        return visualization.get_layout()
     else:
         return main.layout
 
@@ -53,4 +70,6 @@ table_influence.register_callbacks(app)
 statistics.register_callbacks(app)
 
 if __name__ == "__main__":
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_workers(JOB_WORKERS)
     app.run_server(debug=True)
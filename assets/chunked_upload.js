@@ -0,0 +1,80 @@
+(function () {
+    var DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024;
+
+    function randomId() {
+        var bytes = new Uint8Array(16);
+        window.crypto.getRandomValues(bytes);
+        return Array.prototype.map.call(bytes, function (b) {
+            return ('0' + b.toString(16)).slice(-2);
+        }).join('');
+    }
+
+    function setStatus(text) {
+        var status = document.getElementById('chunked-upload-status');
+        if (status) {
+            status.textContent = text;
+        }
+    }
+
+    async function uploadFile(file, chunkSize) {
+        var uploadId = randomId();
+        for (var offset = 0; offset < file.size; offset += chunkSize) {
+            var response = await fetch('/upload/chunk?upload_id=' + uploadId + '&offset=' + offset, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/octet-stream'},
+                body: file.slice(offset, offset + chunkSize)
+            });
+            if (!response.ok) {
+                throw new Error((await response.json()).error);
+            }
+            setStatus('Uploading ' + file.name + ': ' + Math.round(Math.min(offset + chunkSize, file.size) / file.size * 100) + '%');
+        }
+        setStatus('Converting ' + file.name + '...');
+        var poller = setInterval(async function () {
+            var response = await fetch('/upload/status?upload_id=' + uploadId);
+            var progress = response.ok ? await response.json() : {};
+            if (progress.pages_total) {
+                setStatus('Converting ' + file.name + ': page ' + progress.pages_done + ' of ' + progress.pages_total);
+            }
+        }, 1000);
+        var completed;
+        try {
+            completed = await fetch('/upload/complete', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({upload_id: uploadId, filename: file.name})
+            });
+        } finally {
+            clearInterval(poller);
+        }
+        var result = await completed.json();
+        if (!completed.ok) {
+            throw new Error(result.error);
+        }
+        setStatus('Uploaded ' + result.file);
+        var refresh = document.getElementById('chunked-upload-refresh');
+        if (refresh) {
+            refresh.click();
+        }
+    }
+
+    document.addEventListener('click', function (event) {
+        var button = event.target.closest && event.target.closest('#chunked-upload-button');
+        if (!button) {
+            return;
+        }
+        var chunkSize = parseInt(button.dataset.chunkSize, 10) || DEFAULT_CHUNK_SIZE;
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.accept = '.txt,.pdf,.docx';
+        input.addEventListener('change', function () {
+            if (!input.files.length) {
+                return;
+            }
+            uploadFile(input.files[0], chunkSize).catch(function (error) {
+                setStatus('Upload failed: ' + error.message);
+            });
+        });
+        input.click();
+    });
+})();
@@ -0,0 +1,39 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_MODULES = [
+    "pandas", "networkx", "community", "plotly.express", "dash_cytoscape",
+    "dash_daq", "groq", "openai", "PyPDF2", "docx",
+]
+
+
+def measure(statement, runs):
+    code = "import time; start = time.perf_counter(); {}; print(time.perf_counter() - start)".format(statement)
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def report(name, timings):
+    print("{:<8} median {:.3f}s  min {:.3f}s  max {:.3f}s".format(
+        name, statistics.median(timings), min(timings), max(timings)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time of the app")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    lazy = measure("import app", args.runs)
+    eager = measure("; ".join(["import " + name for name in EAGER_MODULES] + ["import app"]), args.runs)
+    report("lazy", lazy)
+    report("eager", eager)
+    print("speedup {:.2f}x".format(statistics.median(eager) / statistics.median(lazy)))
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+import numpy as np
+from utils_viz.layouts import compute_layout
+
+
+def make_graph(num_nodes, seed):
+    return nx.powerlaw_cluster_graph(num_nodes, 2, 0.3, seed=seed)
+
+
+def distance_correlation(G, positions, sources, seed):
+    # Pearson correlation between hop distance and drawn distance on sampled pairs.
+    rng = np.random.RandomState(seed)
+    nodes = list(G.nodes())
+    hops, drawn = [], []
+    for source in rng.choice(nodes, size=min(sources, len(nodes)), replace=False):
+        lengths = nx.single_source_shortest_path_length(G, source)
+        targets = [target for target in lengths if target != source]
+        for target in rng.choice(targets, size=min(200, len(targets)), replace=False):
+            hops.append(lengths[target])
+            drawn.append(np.hypot(*(np.subtract(positions[source], positions[target]))))
+    return float(np.corrcoef(hops, drawn)[0, 1])
+
+
+def neighbourhood_preservation(G, positions, samples, seed):
+    # Share of each node's graph neighbours among its nearest drawn neighbours.
+    rng = np.random.RandomState(seed)
+    nodes = list(G.nodes())
+    coordinates = np.array([positions[node] for node in nodes])
+    index = {node: i for i, node in enumerate(nodes)}
+    scores = []
+    for node in rng.choice(nodes, size=min(samples, len(nodes)), replace=False):
+        neighbours = {index[other] for other in G.neighbors(node)}
+        if not neighbours:
+            continue
+        distances = np.hypot(*(coordinates - coordinates[index[node]]).T)
+        nearest = set(np.argsort(distances)[1:len(neighbours) + 1].tolist())
+        scores.append(len(nearest & neighbours) / len(neighbours))
+    return float(np.mean(scores))
+
+
+def run(G, engine, time_budget):
+    start = time.perf_counter()
+    positions = compute_layout(list(G.nodes()), list(G.edges()), engine, time_budget)
+    return time.perf_counter() - start, positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare graph layout engines for speed and quality")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 250, 400, 2000, 10000])
+    parser.add_argument("--engines", nargs="+", default=["spring", "forceatlas2"])
+    parser.add_argument("--spring-limit", type=int, default=400,
+                        help="largest size the spring engine is run on")
+    parser.add_argument("--time-budget", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("{:>7} {:<12} {:>9} {:>12} {:>13}".format("nodes", "engine", "seconds", "distance r", "neighbours"))
+    for size in args.sizes:
+        G = make_graph(size, args.seed)
+        for engine in args.engines:
+            if engine == "spring" and size > args.spring_limit:
+                continue
+            elapsed, positions = run(G, engine, args.time_budget)
+            print("{:>7} {:<12} {:>9.2f} {:>12.3f} {:>13.3f}".format(
+                size, engine, elapsed,
+                distance_correlation(G, positions, 50, args.seed),
+                neighbourhood_preservation(G, positions, 500, args.seed)))
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils_viz.merging import merge_contained_nodes
+
+
+def pairwise_merge(sorted_nodes):
+    merged_mapping = {}
+    for node in sorted_nodes:
+        for existing in sorted_nodes:
+            if existing == node or existing in merged_mapping:
+                continue
+            if existing in node:
+                merged_mapping[existing] = node
+    return merged_mapping
+
+
+def make_nodes(count, seed):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "sen", "tor", "vi", "del", "an", "co", "pre", "us"]
+    words = ["".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(max(count // 4, 50))]
+    nodes = set()
+    while len(nodes) < count:
+        nodes.add(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+    return sorted(nodes, key=lambda x: -len(x))
+
+
+def measure(fn, nodes):
+    start = time.perf_counter()
+    result = fn(nodes)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare substring node merging strategies")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 10000, 25000, 50000, 100000])
+    parser.add_argument("--pairwise-limit", type=int, default=4000,
+                        help="largest size the pairwise scan is run on")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("{:>8} {:>12} {:>12} {:>10} {:>10}".format("nodes", "automaton", "pairwise", "us/node", "merged"))
+    for size in args.sizes:
+        nodes = make_nodes(size, args.seed)
+        indexed_time, indexed = measure(merge_contained_nodes, nodes)
+        pairwise = "-"
+        if size <= args.pairwise_limit:
+            pairwise_time, expected = measure(pairwise_merge, nodes)
+            if list(expected.items()) != list(indexed.items()):
+                raise SystemExit("merge mismatch at {} nodes".format(size))
+            pairwise = "{:.3f}s".format(pairwise_time)
+        print("{:>8} {:>11.3f}s {:>12} {:>10.1f} {:>10}".format(
+            size, indexed_time, pairwise, indexed_time / size * 1e6, len(indexed)))
@@ -4,4 +4,168 @@ OUTPUT_DIR = "tables_not_filtered"
 FILTERED_OUTPUT_DIR = "tables_filtered"
 UPLOAD_DIR = "uploads"
 IMAGES_DIR = os.path.join(FILTERED_OUTPUT_DIR, "images")
-CSV_DIR = os.path.join(FILTERED_OUTPUT_DIR, "tables_filtered_csv")
\ No newline at end of file
+CSV_DIR = os.path.join(FILTERED_OUTPUT_DIR, "tables_filtered_csv")
+
+MODEL_PROVIDERS = {
+    "llama-3.3-70b-versatile": "groq",
+    "gpt-4o-mini": "openai",
+    "llama-cpp-local": "llamacpp",
+    "mock-replay": "mock",
+}
+# Local and replay models are only offered in the model selector when this is on.
+DEVELOPMENT_MODELS = ["llama-cpp-local", "mock-replay"]
+SHOW_DEVELOPMENT_MODELS = False
+# Total requests in flight per provider; each job worker process gets an equal share of it.
+MAX_CONCURRENT_REQUESTS = {
+    "groq": 4,
+    "openai": 8,
+    "llamacpp": 2,
+    "mock": 16,
+}
+DEFAULT_MAX_CONCURRENT_REQUESTS = 2
+
+CACHE_DIR = "cache"
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite3")
+RESPONSE_CACHE_MAX_ENTRIES = 50000
+
+GRAPH_CACHE_ENABLED = True
+GRAPH_CACHE_MAX_ENTRIES = 128
+GRAPH_CACHE_DISK_ENABLED = False
+GRAPH_CACHE_PATH = os.path.join(CACHE_DIR, "graphs.sqlite3")
+GRAPH_CACHE_DISK_MAX_ENTRIES = 1000
+
+LAYOUT_ENGINE = "forceatlas2"
+LAYOUT_TIME_BUDGET = 3.0
+LAYOUT_MAX_ITERATIONS = 2000
+LAYOUT_TOLERANCE = 0.003
+LAYOUT_SCALING_RATIO = 2.0
+LAYOUT_GRAVITY = 1.0
+LAYOUT_LEAF_SIZE = 4
+
+CHARS_PER_TOKEN = 3.5
+MODEL_CONTEXT_WINDOWS = {
+    "llama-3.3-70b-versatile": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+CHUNK_TOKEN_BUDGETS = {
+    "llama-3.3-70b-versatile": 1200,
+    "gpt-4o-mini": 1200,
+}
+DEFAULT_CHUNK_TOKEN_BUDGET = 800
+CHUNK_RESERVED_TOKENS = 1024 + 256
+CHUNK_OVERLAP_SENTENCES = 1
+CHUNK_CONTENT_DEFINED = True
+CHUNK_MIN_FILL = 0.85
+CHUNK_BOUNDARY_DIVISOR = 4
+
+TEXT_CLEANING_ENABLED = True
+TEXT_CLEANING_STEPS = ["headers_footers", "dehyphenate", "whitespace", "references"]
+HEADER_FOOTER_LINES = 2
+HEADER_FOOTER_MIN_SHARE = 0.5
+REFERENCES_MIN_POSITION = 0.6
+
+PROVIDER_RATE_LIMITS = {
+    "groq": {"requests_per_minute": 30, "tokens_per_minute": 12000},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 200000},
+}
+# Shared by every process, so the limits above hold across all job workers.
+RATE_LIMIT_DB_PATH = os.path.join(CACHE_DIR, "rate_limits.sqlite3")
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+HEDGING_ENABLED = False
+HEDGE_MODELS = {
+    "llama-3.3-70b-versatile": "gpt-4o-mini",
+    "gpt-4o-mini": "llama-3.3-70b-versatile",
+}
+HEDGE_PERCENTILE = 0.95
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_INITIAL_DELAY = 15.0
+HEDGE_MIN_DELAY = 2.0
+JOURNAL_DIR = os.path.join(CACHE_DIR, "journals")
+
+METRICS_DB_PATH = os.path.join(CACHE_DIR, "metrics.sqlite3")
+METRICS_FLUSH_INTERVAL = 5.0
+LATENCY_BUCKETS = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0]
+
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.85
+DEDUP_SHINGLE_SIZE = 5
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 16
+DEDUP_INDEX_PATH = os.path.join(CACHE_DIR, "dedup.sqlite3")
+DEDUP_INDEX_MAX_ENTRIES = 50000
+
+LLM_BACKENDS = {
+    "groq": {
+        "type": "groq",
+        "api_key_name": "api_groq_key",
+        "batch_api": True,
+        "structured_output": "json_object",
+        "timeout": 60.0,
+        "max_connections": 8,
+        "max_keepalive_connections": 4,
+        "keepalive_expiry": 30.0,
+    },
+    "openai": {
+        "type": "openai",
+        "api_key_name": "api_openai_key",
+        "batch_api": True,
+        "structured_output": "json_schema",
+        "timeout": 60.0,
+        "max_connections": 16,
+        "max_keepalive_connections": 8,
+        "keepalive_expiry": 30.0,
+    },
+    "llamacpp": {
+        "type": "openai",
+        "base_url": "http://127.0.0.1:8080/v1",
+        "api_key": "no-key",
+        "structured_output": "json_object",
+        "timeout": 300.0,
+        "max_connections": 4,
+        "max_keepalive_connections": 4,
+        "keepalive_expiry": 120.0,
+    },
+    "mock": {
+        "type": "mock",
+        "structured_output": "json_object",
+        "recordings_path": os.path.join(CACHE_DIR, "recorded_responses.jsonl"),
+        "default_response": "",
+        "latency": 0.0,
+    },
+}
+RECORD_RESPONSES_PATH = None
+STRUCTURED_OUTPUT = False
+
+BATCH_DIR = os.path.join(CACHE_DIR, "batches")
+BATCH_BACKEND = "openai"
+# The "local" batch backend replays recorded responses from this backend instead of calling a provider.
+LOCAL_BATCH_REPLAY_BACKEND = "mock"
+BATCH_POLL_INTERVAL = 30
+BATCH_COMPLETION_WINDOW = "24h"
+
+JOBS_DB_PATH = os.path.join(CACHE_DIR, "jobs.sqlite3")
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_PROGRESS_FLUSH_INTERVAL = 0.5
+JOB_HANDLER_MODULES = ["utils.processing", "utils.corpus"]
+JOB_SHUTDOWN_TIMEOUT = 5.0
+
+CORPUS_FILE_WORKERS = 4
+# Folders a corpus job may read; subfolders are allowed, anything else is rejected.
+CORPUS_ROOTS = [os.path.dirname(TEXT_FILE_PATH)]
+CORPUS_TEXT_DIR = os.path.join(CACHE_DIR, "corpus_text")
+CORPUS_SUMMARY_DIR = os.path.join(FILTERED_OUTPUT_DIR, "run_summaries")
+
+PDF_EXTRACTION_WORKERS = os.cpu_count() or 1
+PDF_PAGES_PER_TASK = 16
+PDF_PARALLEL_MIN_PAGES = 32
+
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_MAX_BYTES = 2 * 1024 * 1024 * 1024
+UPLOAD_PARTIAL_DIR = os.path.join(UPLOAD_DIR, "partial")
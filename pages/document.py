@@ -1,71 +1,94 @@
 from dash import dcc, html, callback_context
 from dash.dependencies import Input, Output, State
 from styles import common_styles, h1_style, description_style, button_style, button_style2, text_content_style, button_style_backtohome
-from config import TEXT_FILE_PATH, OUTPUT_DIR, FILTERED_OUTPUT_DIR, UPLOAD_DIR
-import threading
-import re
-from utils.analysis import *
+from config import (
+    TEXT_FILE_PATH,
+    OUTPUT_DIR,
+    FILTERED_OUTPUT_DIR,
+    UPLOAD_DIR,
+    UPLOAD_CHUNK_SIZE,
+    MODEL_PROVIDERS,
+    DEVELOPMENT_MODELS,
+    SHOW_DEVELOPMENT_MODELS,
+    STRUCTURED_OUTPUT,
+    HEDGING_ENABLED,
+    BATCH_BACKEND
+)
 from utils.converting_documents import *
+from utils.jobs import submit_job, get_job, request_cancel, ACTIVE_STATUSES
+from utils.backends import supports_batch_api
+from utils.uploads import resolve_corpus_directory
 import os
 
-analysis_running = False
-analysis_stop_event = threading.Event()
-progress = 0
-
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(FILTERED_OUTPUT_DIR, exist_ok=True)
 
 selected_model = "llama-3.3-70b-versatile"
-
-def filter_row(row):
-    cleaned_row = re.sub(r'^\d+\.\s*', '', row)
-    cleaned_row = re.sub(r'^-\s*', '', cleaned_row)
-    cleaned_row = re.sub(r'[^a-zA-Zа-яА-Я\s;]', '', cleaned_row)
-    cleaned_row = cleaned_row.strip()
-    if ';' not in cleaned_row:
-        return False
-    parts = cleaned_row.split(';')
-    if len(parts) != 2:
-        return False
-    for part in parts:
-        part = part.strip()
-        if not part or len(part.split()) > 3:
-            return False
-    return True
-
-def process_text_chunks(file_path, output_dir, request_function, chunk_size=2400):
-    global analysis_running, analysis_stop_event, progress
-    analysis_running = True
-    progress = 0
-    original_filename = os.path.basename(file_path)
-    output_filename = f"output_{request_function.__name__}_{original_filename}"
-    output_file = os.path.join(output_dir, output_filename)
-    filtered_output_filename = f"filtered_{output_filename}"
-    filtered_output_file = os.path.join(FILTERED_OUTPUT_DIR, filtered_output_filename)
-
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = file.read().replace('\n', ' ')
-    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
-
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    if not os.path.exists(FILTERED_OUTPUT_DIR):
-        os.makedirs(FILTERED_OUTPUT_DIR)
-
-    with open(output_file, "w", encoding='utf-8') as output_file, open(filtered_output_file, "w", encoding='utf-8') as filtered_file:
-        total_chunks = len(chunks)
-        for i, chunk in enumerate(chunks):
-            if analysis_stop_event.is_set():
-                break
-
-            result = request_function(chunk, selected_model)
-            output_file.write(result + "\n")
-            filtered_result = "\n".join([line for line in result.split("\n") if filter_row(line)])
-            filtered_file.write(filtered_result + "\n")
-            progress = int((i + 1) / total_chunks * 100)
-    analysis_running = False
-    analysis_stop_event.clear()
-    return output_file
+selectable_models = [model for model in MODEL_PROVIDERS
+                     if SHOW_DEVELOPMENT_MODELS or model not in DEVELOPMENT_MODELS]
+
+ANALYSIS_BUTTONS = {
+    'run-analysis-related-button': 'request_related_people',
+    'run-analysis-influential-button': 'request_the_most_influential_people',
+    'run-analysis-related-concepts-button': 'request_related_concepts',
+    'run-analysis-combined-button': 'request_combined_extraction',
+}
+
+REQUEST_OPTIONS = [
+    {'label': 'Related people', 'value': 'request_related_people'},
+    {'label': 'Influential', 'value': 'request_the_most_influential_people'},
+    {'label': 'Related concepts', 'value': 'request_related_concepts'},
+    {'label': 'Everything', 'value': 'request_combined_extraction'}
+]
+
+def format_progress_text(job):
+    state = job['state']
+    parts = [f"{job['progress']}%"]
+    if job['status'] == 'queued':
+        parts.append("waiting for a worker")
+    if state.get('files_total'):
+        parts.append(f"{state.get('files_done', 0)}/{state['files_total']} files, {state.get('pairs', 0)} pairs")
+        if state.get('files_failed'):
+            parts.append(f"failed files: {state['files_failed']}")
+    elif state.get('chunks_total'):
+        parts.append(f"{state.get('chunks_done', 0)}/{state['chunks_total']} chunks, {state.get('pairs', 0)} pairs")
+    if state.get('cache_hits') or state.get('cache_misses'):
+        parts.append(f"cache hits: {state.get('cache_hits', 0)}, misses: {state.get('cache_misses', 0)}")
+    if state.get('extracting') and job['status'] == 'running':
+        parts.append(f"extracting {state['extracting']}")
+    if state.get('throttle'):
+        parts.append(state['throttle'])
+    if job['message']:
+        parts.append(job['message'])
+    if job['status'] in ('completed', 'cancelled') and state.get('cleaning_reports'):
+        for name, report in sorted(state['cleaning_reports'].items()):
+            parts.append(f"{name}: {report}")
+    elif state.get('cleaning_tokens_before'):
+        removed = state['cleaning_tokens_before'] - state.get('cleaning_tokens_after', 0)
+        parts.append(f"cleaning removed ~{removed} of {state['cleaning_tokens_before']} tokens")
+    # A finished run always reports its dedup savings, even when nothing was reused.
+    finished = job['status'] in ('completed', 'cancelled') and 'dedup_calls_saved' in state
+    if state.get('dedup_calls_saved') or finished:
+        parts.append(f"near-duplicate chunks reused: {state['dedup_calls_saved']}, "
+                     f"~{state.get('dedup_tokens_saved', 0)} tokens saved")
+    telemetry = state.get('telemetry')
+    if telemetry and telemetry.get('calls'):
+        parts.append(f"LLM calls: {telemetry['calls']} (errors: {telemetry['errors']}, retries: {telemetry['retries']}), "
+                     f"latency p50 {telemetry['latency_p50']}s / p95 {telemetry['latency_p95']}s, "
+                     f"tokens in/out: {telemetry['prompt_tokens']}/{telemetry['completion_tokens']}")
+    if telemetry and telemetry.get('hedges'):
+        parts.append(f"hedged requests: {telemetry['hedges']} (backup answered first: "
+                     f"{telemetry['hedge_backup_wins']}, ~{telemetry['hedge_cost_tokens']} extra tokens)")
+    if telemetry and telemetry.get('pairs_rejected'):
+        parts.append(f"rejected lines: {telemetry['pairs_rejected']}")
+    if state.get('chunks_unchanged') or state.get('chunks_removed'):
+        parts.append(f"since the last run: {state.get('chunks_unchanged', 0)} chunks unchanged, "
+                     f"{state.get('chunks_new', 0)} new or changed, {state.get('chunks_removed', 0)} removed")
+    if state.get('resumed_chunks'):
+        parts.append(f"resumed chunks: {state['resumed_chunks']}")
+    if state.get('failed_chunks'):
+        parts.append(f"failed chunks: {state['failed_chunks']}")
+    return " | ".join(parts)
 
 def get_file_list(directory):
     return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
@@ -115,16 +138,22 @@ layout = html.Div(
                             },
                             multiple=False
                         ),
+                        html.Button(
+                            "Upload a large file",
+                            id='chunked-upload-button',
+                            style={'width': '100%', 'margin': '5px 0', 'backgroundColor': 'white',
+                                   'border': '1px dashed', 'borderRadius': '5px', 'padding': '10px'},
+                            **{'data-chunk-size': UPLOAD_CHUNK_SIZE}
+                        ),
+                        html.Div(id='chunked-upload-status', style={'fontSize': '12px', 'color': '#555'}),
+                        html.Button(id='chunked-upload-refresh', style={'display': 'none'}),
                         html.Div(
                             style={'display': 'flex', 'flexDirection': 'column', 'marginTop': '10px'},
                             children=[
                                 html.Div([
                                     dcc.RadioItems(
                                         id='model-selector',
-                                        options=[
-                                            {'label': 'llama-3.3-70b-versatile', 'value': 'llama-3.3-70b-versatile'},
-                                            {'label': 'gpt-4o-mini', 'value': 'gpt-4o-mini'}
-                                        ],
+                                        options=[{'label': model, 'value': model} for model in selectable_models],
                                         value=selected_model,
                                         labelStyle={'display': 'block', 'marginBottom': '10px'},
                                         style = {'textAlign':'left'}
@@ -139,6 +168,54 @@ layout = html.Div(
                                 html.Button("Find related concepts", id="run-analysis-related-concepts-button",
                                             style={**button_style, 'border': 'none', 'marginBottom': '10px'}),
                                 html.Div("Discover related concepts", style={'marginBottom': '20px'}),
+                                html.Button("Extract everything", id="run-analysis-combined-button",
+                                            style={**button_style, 'border': 'none', 'marginBottom': '10px'}),
+                                html.Div("People, influential entities and concepts in one pass",
+                                         style={'marginBottom': '20px'}),
+                                dcc.Checklist(
+                                    id='analysis-options',
+                                    options=[{'label': ' Stream results live', 'value': 'stream'},
+                                             {'label': ' Structured JSON output', 'value': 'structured'},
+                                             {'label': ' Hedge slow requests', 'value': 'hedge'}],
+                                    value=(['structured'] if STRUCTURED_OUTPUT else []) + (['hedge'] if HEDGING_ENABLED else []),
+                                    style={'textAlign': 'left', 'marginBottom': '20px'}
+                                ),
+                                html.Div("Batch mode", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
+                                dcc.Dropdown(
+                                    id='batch-request-dropdown',
+                                    options=REQUEST_OPTIONS,
+                                    value='request_combined_extraction',
+                                    clearable=False,
+                                    style={'width': '100%', 'fontSize': '14px', 'textAlign': 'left'}
+                                ),
+                                dcc.Checklist(
+                                    id='batch-scope',
+                                    options=[{'label': ' Whole folder', 'value': 'folder'}],
+                                    value=[],
+                                    style={'textAlign': 'left', 'marginTop': '10px'}
+                                ),
+                                html.Button("Submit batch", id="run-batch-button",
+                                            style={**button_style, 'border': 'none', 'marginBottom': '10px'}),
+                                html.Div("Cheaper offline processing, results arrive later",
+                                         style={'marginBottom': '20px'}),
+                                html.Div("Corpus mode", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
+                                dcc.Input(
+                                    id='corpus-directory',
+                                    type='text',
+                                    value=os.path.dirname(TEXT_FILE_PATH),
+                                    style={'width': '100%', 'fontSize': '14px', 'marginBottom': '10px'}
+                                ),
+                                dcc.Dropdown(
+                                    id='corpus-request-dropdown',
+                                    options=REQUEST_OPTIONS,
+                                    value='request_combined_extraction',
+                                    clearable=False,
+                                    style={'width': '100%', 'fontSize': '14px', 'textAlign': 'left'}
+                                ),
+                                html.Button("Analyse folder", id="run-corpus-button",
+                                            style={**button_style, 'border': 'none', 'marginBottom': '10px'}),
+                                html.Div("Every document in the folder, with a run summary",
+                                         style={'marginBottom': '20px'}),
                                 html.Button("Stop Analysis", id="stop-analysis-button",
                                             style={**button_style2, 'border': 'none', 'display': 'none',
                                                    'marginLeft': '10px'})
@@ -188,6 +265,8 @@ layout = html.Div(
             ]
         ),
 
+        dcc.Store(id='analysis-job-id'),
+
         dcc.Interval(
             id='progress-interval',
             interval=1000,
@@ -205,20 +284,28 @@ def register_callbacks(app):
     @app.callback(
         [Output('file-dropdown', 'options'),
          Output('file-dropdown', 'value')],
-        [Input('upload-file', 'contents')],
+        [Input('upload-file', 'contents'),
+         Input('chunked-upload-refresh', 'n_clicks')],
         State('upload-file', 'filename'),
         State('upload-file', 'last_modified')
     )
-    def upload_and_convert_file(contents, filename, last_modified):
+    def upload_and_convert_file(contents, refresh_clicks, filename, last_modified):
+        upload_dir = os.path.dirname(TEXT_FILE_PATH)
+        ctx = callback_context
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+
+        if trigger_id == 'chunked-upload-refresh':
+            file_list = get_file_list(upload_dir)
+            latest_file = max(file_list, key=lambda f: os.path.getmtime(os.path.join(upload_dir, f)), default=None)
+            return [{'label': file, 'value': file} for file in file_list], latest_file
+
         if contents is not None:
-            upload_dir = os.path.dirname(TEXT_FILE_PATH)
             upload_path = save_uploaded_file(contents, filename, upload_dir)
             converted_file_path = convert_to_txt(upload_path, upload_dir)
 
             file_list = get_file_list(upload_dir)
             return [{'label': file, 'value': file} for file in file_list], os.path.basename(converted_file_path)
 
-        upload_dir = os.path.dirname(TEXT_FILE_PATH)
         file_list = get_file_list(upload_dir)
         return [{'label': file, 'value': file} for file in file_list], None
 
@@ -245,69 +332,112 @@ def register_callbacks(app):
          Output('progress-bar', 'style'),
          Output('progress-text', 'children'),
          Output('progress-interval', 'disabled'),
-         Output('stop-analysis-button', 'style')],
+         Output('stop-analysis-button', 'style'),
+         Output('analysis-job-id', 'data')],
         [Input('run-analysis-related-button', 'n_clicks'),
          Input('run-analysis-influential-button', 'n_clicks'),
          Input('run-analysis-related-concepts-button', 'n_clicks'),
+         Input('run-analysis-combined-button', 'n_clicks'),
+         Input('run-batch-button', 'n_clicks'),
+         Input('run-corpus-button', 'n_clicks'),
          Input('stop-analysis-button', 'n_clicks'),
          Input('progress-interval', 'n_intervals')],
-        State('file-dropdown', 'value')
+        State('file-dropdown', 'value'),
+        State('model-selector', 'value'),
+        State('batch-request-dropdown', 'value'),
+        State('batch-scope', 'value'),
+        State('analysis-options', 'value'),
+        State('corpus-directory', 'value'),
+        State('corpus-request-dropdown', 'value'),
+        State('analysis-job-id', 'data')
     )
-    def update_progress(related_clicks, influential_clicks, related_concepts_clicks, stop_clicks, n_intervals,
-                        selected_file):
-        global analysis_running, progress
-
+    def update_progress(related_clicks, influential_clicks, related_concepts_clicks, combined_clicks, batch_clicks,
+                        corpus_clicks, stop_clicks, n_intervals, selected_file, model, batch_request, batch_scope,
+                        analysis_options, corpus_directory, corpus_request, job_id):
         ctx = callback_context
         if not ctx.triggered:
-            return {'display': 'none'}, {'width': '0%'}, "0%", True, {'display': 'none'}
+            return {'display': 'none'}, {'width': '0%'}, "0%", True, {'display': 'none'}, job_id
 
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+        upload_dir = os.path.dirname(TEXT_FILE_PATH)
 
-        if trigger_id in ['run-analysis-related-button', 'run-analysis-influential-button',
-                          'run-analysis-related-concepts-button']:
+        if trigger_id == 'run-batch-button':
+            if 'folder' in (batch_scope or []):
+                file_paths = [os.path.join(upload_dir, f) for f in get_file_list(upload_dir) if f.endswith('.txt')]
+            elif selected_file:
+                file_paths = [os.path.join(upload_dir, selected_file)]
+            else:
+                return {'display': 'none'}, {'width': '0%'}, "Please select a file first.", True, {'display': 'none'}, job_id
+            if BATCH_BACKEND == "openai" and not supports_batch_api(model):
+                return {'display': 'none'}, {'width': '0%'}, f"{model} has no batch API.", True, {'display': 'none'}, job_id
+
+            new_job_id = submit_job('batch', {
+                'file_paths': file_paths,
+                'request_name': batch_request,
+                'model': model,
+                'output_dir': OUTPUT_DIR,
+                'structured': 'structured' in (analysis_options or []),
+            })
+            return {'display': 'block'}, {'width': '0%'}, "Preparing batch...", False, {'display': 'block', **button_style2}, new_job_id
+
+        if trigger_id == 'run-corpus-button':
+            try:
+                corpus_directory = resolve_corpus_directory(corpus_directory or "")
+            except ValueError as e:
+                return {'display': 'none'}, {'width': '0%'}, str(e), True, {'display': 'none'}, job_id
+
+            new_job_id = submit_job('corpus', {
+                'directory': corpus_directory,
+                'request_name': corpus_request,
+                'model': model,
+                'output_dir': OUTPUT_DIR,
+                'stream': 'stream' in (analysis_options or []),
+                'structured': 'structured' in (analysis_options or []),
+                'hedge': 'hedge' in (analysis_options or []),
+            })
+            return {'display': 'block'}, {'width': '0%'}, "Preparing corpus run...", False, {'display': 'block', **button_style2}, new_job_id
+
+        if trigger_id in ANALYSIS_BUTTONS:
             if not selected_file:
-                return {'display': 'none'}, {'width': '0%'}, "Please select a file first.", True, {'display': 'none'}
-
-            file_path = os.path.join(os.path.dirname(TEXT_FILE_PATH), selected_file)
-            if trigger_id == 'run-analysis-related-button':
-                analysis_thread = threading.Thread(target=process_text_chunks,
-                                                   args=(file_path, OUTPUT_DIR, request_related_people))
-            elif trigger_id == 'run-analysis-influential-button':
-                analysis_thread = threading.Thread(target=process_text_chunks,
-                                                   args=(file_path, OUTPUT_DIR, request_the_most_influential_people))
-            elif trigger_id == 'run-analysis-related-concepts-button':
-                analysis_thread = threading.Thread(target=process_text_chunks,
-                                                   args=(file_path, OUTPUT_DIR, request_related_concepts))
-
-            analysis_thread.start()
-
-            return {'display': 'block'}, {'width': '0%'}, "0%", False, {'display': 'block', **button_style2}
-
-        elif trigger_id == 'stop-analysis-button':
-            if analysis_running:
-                analysis_stop_event.set()
+                return {'display': 'none'}, {'width': '0%'}, "Please select a file first.", True, {'display': 'none'}, job_id
+
+            new_job_id = submit_job('analysis', {
+                'file_path': os.path.join(upload_dir, selected_file),
+                'request_name': ANALYSIS_BUTTONS[trigger_id],
+                'model': model,
+                'output_dir': OUTPUT_DIR,
+                'stream': 'stream' in (analysis_options or []),
+                'structured': 'structured' in (analysis_options or []),
+                'hedge': 'hedge' in (analysis_options or []),
+            })
+            return {'display': 'block'}, {'width': '0%'}, "0%", False, {'display': 'block', **button_style2}, new_job_id
+
+        job = get_job(job_id) if job_id else None
+
+        if trigger_id == 'stop-analysis-button':
+            if job and job['status'] in ACTIVE_STATUSES:
+                request_cancel(job_id)
                 return {'display': 'block'}, {'width': '100%',
                                               'backgroundColor': '#ff4d4d'}, "Analysis stopped by user.", True, {
-                    'display': 'none'}
+                    'display': 'none'}, job_id
             else:
-                return {'display': 'none'}, {'width': '0%'}, "No analysis is running.", True, {'display': 'none'}
+                return {'display': 'none'}, {'width': '0%'}, "No analysis is running.", True, {'display': 'none'}, job_id
 
         elif trigger_id == 'progress-interval':
-            if analysis_running:
-                return {'display': 'block'}, {'width': f'{progress}%',
-                                              'backgroundColor': '#007acc'}, f"{progress}%", False, {'display': 'block', **button_style2}
+            if job and job['status'] in ACTIVE_STATUSES:
+                return {'display': 'block'}, {'width': f"{job['progress']}%",
+                                              'backgroundColor': '#007acc'}, format_progress_text(job), False, {'display': 'block', **button_style2}, job_id
+            elif job and job['status'] == 'failed':
+                return {'display': 'block'}, {'width': '100%',
+                                              'backgroundColor': '#ff4d4d'}, format_progress_text(job), True, {'display': 'none'}, job_id
+            elif job and job['status'] in ('completed', 'cancelled'):
+                # Keep the final summary on screen; telemetry is only written as the job finishes.
+                color = '#007acc' if job['status'] == 'completed' else '#ff4d4d'
+                return {'display': 'block'}, {'width': f"{job['progress']}%",
+                                              'backgroundColor': color}, format_progress_text(job), True, {'display': 'none'}, job_id
             else:
-                return {'display': 'none'}, {'width': '0%'}, "", True, {'display': 'none'}
-
-        return {'display': 'none'}, {'width': '0%'}, "", True, {'display': 'none'}
+                return {'display': 'none'}, {'width': '0%'}, "", True, {'display': 'none'}, job_id
 
-    @app.callback(
-        Output('model-selector', 'value'),
-        [Input('model-selector', 'value')]
-    )
-    def update_model_selection(model):
-        global selected_model
-        selected_model = model
-        return selected_model
+        return {'display': 'none'}, {'width': '0%'}, "", True, {'display': 'none'}, job_id
 
     return app
\ No newline at end of file
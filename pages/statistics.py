@@ -2,12 +2,14 @@ import os
 import logging
 from collections import Counter
 from dash import html, dcc, Input, Output
-import plotly.express as px
-import pandas as pd
-import networkx as nx
 from config import FILTERED_OUTPUT_DIR
 from styles import common_styles, h1_style, button_style_backtohome, description_style
 from components.dropdown import create_dropdown
+from utils.lazy import lazy_import
+from utils_viz.ingestion import read_pairs, clean_names, build_edge_table
+
+px = lazy_import("plotly.express")
+pd = lazy_import("pandas")
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -26,46 +28,30 @@ def safe_file_operation(func):
     return wrapper
 
 
+def read_named_pairs(file):
+    data = read_pairs(file)
+    return clean_names(data["object_1"], lower=False), clean_names(data["object_2"], lower=False)
+
+
 @safe_file_operation
 def count_occurrences(file):
-    counter = Counter()
-    for line in file:
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(';')
-        if len(parts) != 2:
-            continue
-        node1, node2 = map(str.strip, parts)
-        if node1:
-            counter[node1] += 1
-        if node2:
-            counter[node2] += 1
+    sources, targets = read_named_pairs(file)
+    names = pd.concat([sources, targets], ignore_index=True)
+    counter = Counter(names[names != ""].value_counts().to_dict())
     return counter or None
 
 
 @safe_file_operation
 def calculate_influence(file):
-    G = nx.Graph()
-    for line in file:
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(';')
-        if len(parts) != 2:
-            continue
-        node1, node2 = map(str.strip, parts)
-        if node1 and node2:
-            G.add_edge(node1, node2)
-
-    if G.number_of_nodes() == 0:
-        return None
-
-    isolates = list(nx.isolates(G))
-    if isolates:
-        G.remove_nodes_from(isolates)
-
-    return dict(G.degree()) if G else None
+    sources, targets = read_named_pairs(file)
+    keep = (sources != "") & (targets != "")
+    table = build_edge_table(sources[keep], targets[keep])
+    degrees = table.degree_dict()
+    # A self-pair is one loop in the graph and adds 2 to its node's degree.
+    for name in set(sources[keep & (sources == targets)].tolist()):
+        degrees[name] += 2
+    degrees = {name: degree for name, degree in degrees.items() if degree}
+    return degrees or None
 
 
 def create_visualization(data, title, color):
@@ -1,5 +1,5 @@
 import os
-import pandas as pd
+from utils.lazy import lazy_import
 from dash import html, dash_table
 from dash.dependencies import Input, Output
 from styles import (
@@ -16,6 +16,9 @@ from styles import (
 )
 from config import FILTERED_OUTPUT_DIR
 from components.dropdown import create_dropdown
+
+pd = lazy_import("pandas")
+
 def load_data(file_name):
     input_file = os.path.join(FILTERED_OUTPUT_DIR, file_name)
     df = pd.read_csv(input_file, sep=';', header=None, encoding='utf-8', on_bad_lines='skip').fillna('')
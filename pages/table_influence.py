@@ -1,6 +1,4 @@
 import os
-import pandas as pd
-import networkx as nx
 from dash import html, dash_table
 from dash.dependencies import Input, Output
 from styles import (
@@ -16,21 +14,18 @@ from styles import (
 )
 from config import FILTERED_OUTPUT_DIR
 from components.dropdown import create_dropdown
+from utils.lazy import lazy_import
+from utils_viz.ingestion import load_edge_table
+
+pd = lazy_import("pandas")
 
 
 def load_data(file_path):
     if os.path.exists(file_path):
         try:
-            df = pd.read_csv(file_path, sep=';', header=None, encoding='utf-8', on_bad_lines='skip')
-            df = df.rename(columns={0: "object_1", 1: "object_2"})
-            df = df[df["object_1"] != df["object_2"]]
-            G = nx.Graph()
-            for _, row in df.iterrows():
-                G.add_edge(row["object_1"], row["object_2"])
-
-            degrees = dict(G.degree())
-            degrees_df = pd.DataFrame(list(degrees.items()), columns=["object", "degree"])
-            degrees_df = degrees_df.groupby("object", as_index=False).sum()
+            table = load_edge_table(file_path, lower=False)
+            degrees_df = pd.DataFrame({"object": table.names, "degree": table.degrees})
+            degrees_df = degrees_df[degrees_df["degree"] > 0].sort_values("object", ignore_index=True)
 
             return degrees_df
         except Exception as e:
@@ -87,8 +82,6 @@ def create_layout():
     )
 
 
-layout = create_layout()
-
 
 def register_callbacks(app):
     @app.callback(
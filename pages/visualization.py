@@ -1,5 +1,4 @@
 from dash import dcc, Input, Output, State, html
-import dash_cytoscape as cyto
 from styles import (
     visualization_layout_style,
     visualization_cytoscape_style,
@@ -9,21 +8,31 @@ from styles import (
     main_content_style,
     error_message_style
 )
-import dash_daq as daq
 from utils_viz.nodes import *
+from utils_viz.graph_cache import file_fingerprint
+from utils_viz.layouts import layout_engines
 import os
-import pandas as pd
 from dash.exceptions import PreventUpdate
 from components.dropdown import create_dropdown
 from components.node_panels import create_rename_panel
+from utils.lazy import lazy_import
+
+cyto = lazy_import("dash_cytoscape")
+daq = lazy_import("dash_daq")
+pd = lazy_import("pandas")
+
+LAYOUT_ENGINE_LABELS = {
+    'forceatlas2': 'ForceAtlas2 (Barnes-Hut)',
+    'spring': 'Spring (networkx)'
+}
 
 os.makedirs(IMAGES_DIR, exist_ok=True)
 os.makedirs(CSV_DIR, exist_ok=True)
 
-def create_layout(file_name, min_color, max_color, max_objects, avg_size, node_spacing):
-    nodes, edges, error_message = load_data(file_name, min_color, max_color, max_objects, avg_size)
+def create_layout(file_name, max_objects, node_spacing, layout_engine, style):
+    nodes, edges, degree_range, error_message = load_data(file_name, max_objects, layout_engine)
     if error_message:
-        return error_message
+        return error_message, degree_range
 
     return html.Div(
         style=visualization_layout_style,
@@ -33,31 +42,7 @@ def create_layout(file_name, min_color, max_color, max_objects, avg_size, node_s
                 elements=nodes + edges,
                 layout={'name': 'preset', 'spacingFactor': node_spacing / 100},
                 style=visualization_cytoscape_style,
-                stylesheet=[
-                    {
-                        'selector': 'node',
-                        'style': {
-                            'content': 'data(label)',
-                            'background-color': 'data(color)',
-                            'width': 'data(size)',
-                            'height': 'data(size)',
-                            'border-color': 'data(border_color)',
-                            'border-width': '2px',
-                            'text-halign': 'center',
-                            'text-valign': 'center',
-                            'font-family': 'Helvetica'
-                        }
-                    },
-                    {
-                        'selector': 'edge',
-                        'style': {
-                            'line-color': 'data(color)',
-                            'target-arrow-shape': 'triangle',
-                            'target-arrow-color': 'data(color)',
-                            'font-family': 'Helvetica'
-                        }
-                    }
-                ]
+                stylesheet=build_stylesheet(*degree_range, **style)
             ),
             html.Div(
                 id='node-info-container',
@@ -82,239 +67,250 @@ def create_layout(file_name, min_color, max_color, max_objects, avg_size, node_s
                 ]
             )
         ]
-    )
+    ), degree_range
+
+def get_layout():
+    return html.Div(
+        style={
+            'display': 'flex',
+            'flexDirection': 'row',
+            'height': '100vh',
+            'fontFamily': 'Helvetica',
+            'backgroundColor': '#FFFAEB',
+        },
+        children=[
+            dcc.Download(id="download-csv"),
+            dcc.Store(id='graph-structure'),
+            html.Div(
+                id='sidebar',
+                style=sidebar_style,
+                children=[
+                    html.H3("Visualization", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
+                                                    'textAlign': 'center'}),
+                    create_dropdown(),
+                    dcc.Dropdown(
+                        id='layout-dropdown',
+                        options=[
+                            {'label': 'Random', 'value': 'random'},
+                            {'label': 'Preset', 'value': 'preset'},
+                            {'label': 'Grid', 'value': 'grid'},
+                            {'label': 'Circle', 'value': 'circle'},
+                            {'label': 'Concentric', 'value': 'concentric'},
+                            {'label': 'Breadthfirst', 'value': 'breadthfirst'},
+                            {'label': 'Cose', 'value': 'cose'}
+                        ],
+                        placeholder="Select a preset",
+                        style={'width': '100%', 'marginBottom': '20px', 'fontFamily': 'Helvetica'},
+                        clearable=False,
+                    ),
+
+                    html.H3("Size Settings", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
+                                                    'textAlign': 'center', 'marginTop': '-10px'}),
+
+                    html.Label("Text Size", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='text-size-slider',
+                            min=10,
+                            max=30,
+                            step=1,
+                            value=12,
+                            marks={i: str(i) for i in range(10, 31, 5)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
+                        ),
+                        style={'width': '90%', 'marginBottom': '20px'}
+                    ),
 
-layout = html.Div(
-    style={
-        'display': 'flex',
-        'flexDirection': 'row',
-        'height': '100vh',
-        'fontFamily': 'Helvetica',
-        'backgroundColor': '#FFFAEB',
-    },
-    children=[
-        dcc.Download(id="download-csv"),
-        html.Div(
-            id='sidebar',
-            style=sidebar_style,
-            children=[
-                html.H3("Visualization", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
-                                                'textAlign': 'center'}),
-                create_dropdown(),
-                dcc.Dropdown(
-                    id='layout-dropdown',
-                    options=[
-                        {'label': 'Random', 'value': 'random'},
-                        {'label': 'Preset', 'value': 'preset'},
-                        {'label': 'Grid', 'value': 'grid'},
-                        {'label': 'Circle', 'value': 'circle'},
-                        {'label': 'Concentric', 'value': 'concentric'},
-                        {'label': 'Breadthfirst', 'value': 'breadthfirst'},
-                        {'label': 'Cose', 'value': 'cose'}
-                    ],
-                    placeholder="Select a preset",
-                    style={'width': '100%', 'marginBottom': '20px', 'fontFamily': 'Helvetica'},
-                    clearable=False,
-                ),
-
-                html.H3("Size Settings", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
-                                                'textAlign': 'center', 'marginTop': '-10px'}),
-
-                html.Label("Text Size", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left'}),
-                html.Div(
-                    dcc.Slider(
-                        id='text-size-slider',
-                        min=10,
-                        max=30,
-                        step=1,
-                        value=12,
-                        marks={i: str(i) for i in range(10, 31, 5)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+                    html.Label("Node Size", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
+                                                   'marginTop': '10px'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='node-size-slider',
+                            min=10,
+                            max=150,
+                            step=10,
+                            value=50,
+                            marks={i: str(i) for i in range(10, 151, 20)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
+                        ),
+                        style={'width': '90%', 'marginBottom': '20px'}
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-
-                html.Label("Node Size", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
-                                               'marginTop': '10px'}),
-                html.Div(
-                    dcc.Slider(
-                        id='node-size-slider',
-                        min=10,
-                        max=150,
-                        step=10,
-                        value=50,
-                        marks={i: str(i) for i in range(10, 151, 20)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+
+                    html.Label("Edge Thickness", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
+                                                        'marginTop': '10px'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='edge-thickness-slider',
+                            min=1,
+                            max=10,
+                            step=1,
+                            value=2,
+                            marks={i: str(i) for i in range(1, 11, 1)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
+                        ),
+                        style={'width': '90%', 'marginBottom': '20px'}
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-
-                html.Label("Edge Thickness", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
-                                                    'marginTop': '10px'}),
-                html.Div(
-                    dcc.Slider(
-                        id='edge-thickness-slider',
-                        min=1,
-                        max=10,
-                        step=1,
-                        value=2,
-                        marks={i: str(i) for i in range(1, 11, 1)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+
+                    html.Label("Node Spacing", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left', 'marginTop': '10px'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='node-spacing-slider',
+                            min=100,
+                            max=5000,
+                            step=50,
+                            value=100,
+                            marks={i: str(i) for i in range(100, 5000, 500)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
+                        ),
+                        style={'width': '90%', 'marginBottom': '20px'}
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-
-                html.Label("Node Spacing", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left', 'marginTop': '10px'}),
-                html.Div(
-                    dcc.Slider(
-                        id='node-spacing-slider',
-                        min=100,
-                        max=5000,
-                        step=50,
-                        value=100,
-                        marks={i: str(i) for i in range(100, 5000, 500)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+
+                    html.Label("Average Node Size",
+                               style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
+                                      'marginTop': '10px'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='avg-size-slider',
+                            min=10,
+                            max=100,
+                            step=5,
+                            value=30,
+                            marks={i: str(i) for i in range(10, 101, 10)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
+                        ),
+                        style={'width': '90%', 'marginBottom': '20px'}
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-
-                html.Label("Average Node Size",
-                           style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left',
-                                  'marginTop': '10px'}),
-                html.Div(
-                    dcc.Slider(
-                        id='avg-size-slider',
-                        min=10,
-                        max=100,
-                        step=5,
-                        value=30,
-                        marks={i: str(i) for i in range(10, 101, 10)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+
+                    html.H3("Colors", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
+                                             'textAlign': 'center'}),
+
+                    html.Div(
+                        style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center',
+                               'marginTop': '10px', 'width': '100%'},
+                        children=[
+                            html.Div(
+                                style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center',
+                                       'width': '48%'},
+                                children=[
+                                    html.Label("Min Color", style={'color': '#1B5E67', 'fontFamily': 'Helvetica',
+                                                                   'marginBottom': '10px'}),
+                                    daq.ColorPicker(
+                                        id='min-color-picker',
+                                        value=dict(hex='#FF69B4'),
+                                        style={'border': 'none', 'boxShadow': 'none', 'width': '100%'}
+                                    )
+                                ]
+                            ),
+                            html.Div(
+                                style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center',
+                                       'width': '48%'},
+                                children=[
+                                    html.Label("Max Color", style={'color': '#1B5E67', 'fontFamily': 'Helvetica',
+                                                                   'marginBottom': '10px'}),
+                                    daq.ColorPicker(
+                                        id='max-color-picker',
+                                        value=dict(hex='#1E90FF'),
+                                        style={'border': 'none', 'boxShadow': 'none', 'width': '100%'}
+                                    )
+                                ]
+                            )
+                        ]
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-
-                html.H3("Colors", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'marginBottom': '20px',
-                                         'textAlign': 'center'}),
-
-                html.Div(
-                    style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center',
-                           'marginTop': '10px', 'width': '100%'},
-                    children=[
-                        html.Div(
-                            style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center',
-                                   'width': '48%'},
-                            children=[
-                                html.Label("Min Color", style={'color': '#1B5E67', 'fontFamily': 'Helvetica',
-                                                               'marginBottom': '10px'}),
-                                daq.ColorPicker(
-                                    id='min-color-picker',
-                                    value=dict(hex='#FF69B4'),
-                                    style={'border': 'none', 'boxShadow': 'none', 'width': '100%'}
-                                )
-                            ]
+
+                    html.Label("Max Objects", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left'}),
+                    html.Div(
+                        dcc.Slider(
+                            id='max-objects-slider',
+                            min=10,
+                            max=500,
+                            step=10,
+                            value=50,
+                            marks={i: str(i) for i in range(10, 501, 50)},
+                            tooltip={'placement': 'bottom', 'always_visible': True},
                         ),
-                        html.Div(
-                            style={'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center',
-                                   'width': '48%'},
-                            children=[
-                                html.Label("Max Color", style={'color': '#1B5E67', 'fontFamily': 'Helvetica',
-                                                               'marginBottom': '10px'}),
-                                daq.ColorPicker(
-                                    id='max-color-picker',
-                                    value=dict(hex='#1E90FF'),
-                                    style={'border': 'none', 'boxShadow': 'none', 'width': '100%'}
-                                )
-                            ]
-                        )
-                    ]
-                ),
-
-                html.Label("Max Objects", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left'}),
-                html.Div(
-                    dcc.Slider(
-                        id='max-objects-slider',
-                        min=10,
-                        max=500,
-                        step=10,
-                        value=50,
-                        marks={i: str(i) for i in range(10, 501, 50)},
-                        tooltip={'placement': 'bottom', 'always_visible': True},
+                        style={'width': '90%', 'marginBottom': '20px'}
                     ),
-                    style={'width': '90%', 'marginBottom': '20px'}
-                ),
-                html.Button("Apply", id='apply-button', style={**button_style_backtohome, "border": "none"}),
-            ]
-        ),
-
-        html.Div(
-            id='main-content',
-            style=main_content_style,
-            children=[
-                html.Div(id='visualization-content')
-            ]
-        )
-    ]
-)
+                    html.Label("Layout Engine", style={'color': '#1B5E67', 'fontFamily': 'Helvetica', 'textAlign': 'left'}),
+                    dcc.Dropdown(
+                        id='layout-engine-dropdown',
+                        options=[{'label': LAYOUT_ENGINE_LABELS.get(name, name), 'value': name} for name in layout_engines],
+                        value=LAYOUT_ENGINE,
+                        style={'width': '100%', 'marginBottom': '20px', 'fontFamily': 'Helvetica'},
+                        clearable=False,
+                    ),
+                    html.Button("Apply", id='apply-button', style={**button_style_backtohome, "border": "none"}),
+                ]
+            ),
+
+            html.Div(
+                id='main-content',
+                style=main_content_style,
+                children=[
+                    html.Div(id='visualization-content')
+                ]
+            )
+        ]
+    )
 
 def register_callbacks(app):
     @app.callback(
         Output('visualization-content', 'children'),
+        Output('graph-structure', 'data'),
         Input('apply-button', 'n_clicks'),
         State('file-dropdown', 'value'),
+        State('max-objects-slider', 'value'),
+        State('node-spacing-slider', 'value'),
+        State('layout-engine-dropdown', 'value'),
+        State('graph-structure', 'data'),
         State('min-color-picker', 'value'),
         State('max-color-picker', 'value'),
-        State('max-objects-slider', 'value'),
         State('avg-size-slider', 'value'),
-        State('node-spacing-slider', 'value')
+        State('text-size-slider', 'value'),
+        State('edge-thickness-slider', 'value')
     )
-    def update_visualization(n_clicks, selected_file, min_color, max_color, max_objects, avg_size, node_spacing):
+    def update_visualization(n_clicks, selected_file, max_objects, node_spacing, layout_engine, current_structure,
+                             min_color, max_color, avg_size, text_size, edge_thickness):
         if n_clicks is None or not selected_file:
             return html.Div([
                 html.Div("Please select a file and click 'Apply' to visualize.", style=error_message_style),
                 html.A("Back to Home", href="/", style={**button_style, **button_style_backtohome})
             ], style={'display': 'flex', 'flexDirection': 'column', 'justify-content': 'center',
-                      'align-items': 'center', 'height': '100vh'})
-        return create_layout(selected_file, min_color['hex'], max_color['hex'], max_objects, avg_size, node_spacing)
+                      'align-items': 'center', 'height': '100vh'}), None
+
+        file_path = os.path.join(FILTERED_OUTPUT_DIR, selected_file)
+        params = {
+            'file': selected_file,
+            'fingerprint': file_fingerprint(file_path) if os.path.exists(file_path) else None,
+            'max_objects': max_objects,
+            'node_spacing': node_spacing,
+            'layout_engine': layout_engine
+        }
+        # Only visual settings changed: update_stylesheet restyles the graph in place.
+        if current_structure and current_structure['params'] == params:
+            raise PreventUpdate
+
+        style = {'min_color': min_color['hex'], 'max_color': max_color['hex'], 'avg_size': avg_size,
+                 'text_size': text_size, 'edge_thickness': edge_thickness}
+        content, degree_range = create_layout(selected_file, max_objects, node_spacing, layout_engine, style)
+        return content, {'params': params, 'degree_range': degree_range}
 
     @app.callback(
         Output('cytoscape-graph', 'stylesheet'),
         Input('apply-button', 'n_clicks'),
+        Input('graph-structure', 'data'),
+        State('min-color-picker', 'value'),
+        State('max-color-picker', 'value'),
+        State('avg-size-slider', 'value'),
         State('text-size-slider', 'value'),
-        State('node-size-slider', 'value'),
         State('edge-thickness-slider', 'value')
     )
-    def update_stylesheet(n_clicks, text_size, node_size, edge_thickness):
-        if n_clicks is None:
-            return []
-
-        return [
-            {
-                'selector': 'node',
-                'style': {
-                    'content': 'data(label)',
-                    'font-size': f"{text_size}px",
-                    'background-color': 'data(color)',
-                    'width': 'data(size)',
-                    'height': 'data(size)',
-                    'border-color': 'data(border_color)',
-                    'border-width': '2px',
-                    'text-halign': 'center',
-                    'text-valign': 'center',
-                    'font-family': 'Helvetica'
-                }
-            },
-            {
-                'selector': 'edge',
-                'style': {
-                    'line-color': 'data(color)',
-                    'width': f'{edge_thickness}',
-                    'target-arrow-shape': 'triangle',
-                    'target-arrow-color': 'data(color)',
-                    'font-family': 'Helvetica'
-                }
-            }
-        ]
+    def update_stylesheet(n_clicks, structure, min_color, max_color, avg_size, text_size, edge_thickness):
+        if n_clicks is None or not structure:
+            raise PreventUpdate
+
+        min_degree, max_degree = structure['degree_range']
+        return build_stylesheet(min_degree, max_degree, min_color['hex'], max_color['hex'],
+                                avg_size, text_size, edge_thickness)
 
     @app.callback(
         Output('cytoscape-graph', 'layout'),
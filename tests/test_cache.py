@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_depends_on_every_part():
+    messages = [{"role": "user", "content": "text"}]
+    assert make_cache_key("request", messages, "model") == make_cache_key("request", messages, "model")
+    assert make_cache_key("request", messages, "model") != make_cache_key("request", messages, "other")
+    assert make_cache_key({"a": 1, "b": 2}) == make_cache_key({"b": 2, "a": 1})
+
+
+def test_cache_round_trip_and_stats(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache" / "responses.sqlite3"), max_entries=10)
+    assert cache.get("missing") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+    reopened = ResponseCache(cache.path, max_entries=10)
+    assert reopened.get("key") == "value"
+
+
+def test_cache_trims_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_entries=2)
+    cache.set("first", "1")
+    time.sleep(0.01)
+    cache.set("second", "2")
+    time.sleep(0.01)
+    assert cache.get("first") == "1"
+    time.sleep(0.01)
+    cache.set("third", "3")
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "1"
+    assert cache.get("third") == "3"
+    assert cache.stats()['entries'] == 2
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_entries=10, enabled=False)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+    assert not os.path.exists(cache.path)
@@ -0,0 +1,63 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.chunking import chunk_text, estimate_tokens, is_content_boundary, normalize_whitespace, split_sentences
+
+TEXT = "\n\n".join(
+    " ".join(f"Sentence {paragraph}.{sentence} talks about topic {paragraph * 7 + sentence}."
+             for sentence in range(6))
+    for paragraph in range(12)
+)
+
+
+def test_sentences_do_not_cross_paragraphs():
+    text = "First sentence. Second one!\n\nThird \"quoted.\" Fourth"
+    sentences = [text[start:end] for start, end in split_sentences(text)]
+    assert sentences == ["First sentence.", "Second one!", "Third \"quoted.\"", "Fourth"]
+
+
+def test_long_sentence_is_split_at_words_within_budget():
+    text = " ".join(["word"] * 200)
+    spans = split_sentences(text, token_budget=10)
+    assert len(spans) > 1
+    assert all(estimate_tokens(text[start:end]) <= 10 for start, end in spans)
+    assert " ".join(text[start:end] for start, end in spans) == text
+
+
+def test_chunks_stay_within_budget_and_end_on_sentences():
+    sentences = {normalize_whitespace(TEXT[start:end]) for start, end in split_sentences(TEXT)}
+    chunks = chunk_text(TEXT, token_budget=60, overlap_sentences=0, content_defined=False)
+    assert len(chunks) > 1
+    for index, chunk in enumerate(chunks):
+        assert chunk['index'] == index
+        assert estimate_tokens(chunk['text']) <= 60
+        assert TEXT[chunk['end'] - 1] == "."
+        assert normalize_whitespace(TEXT[chunk['start']:chunk['end']]) == chunk['text']
+        assert chunk['text'].split(". ")[-1].rstrip(".") + "." in sentences
+    covered = " ".join(chunk['text'] for chunk in chunks)
+    assert covered == normalize_whitespace(TEXT)
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = chunk_text(TEXT, token_budget=60, overlap_sentences=1, content_defined=False)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last_sentence = previous['text'].rsplit(". ", 1)[-1]
+        assert chunk['text'].startswith(last_sentence)
+        assert chunk['start'] < previous['end']
+
+
+def test_content_defined_chunks_end_at_boundary_sentences():
+    sentences = [normalize_whitespace(TEXT[start:end]) for start, end in split_sentences(TEXT)]
+    chunks = chunk_text(TEXT, token_budget=200, overlap_sentences=0, content_defined=True)
+    position = 0
+    for chunk in chunks[:-1]:
+        count = len(chunk['text'].split(". "))
+        assert " ".join(sentences[position:position + count]) == chunk['text']
+        position += count
+        tokens = sum(estimate_tokens(sentence) + 1 for sentence in sentences[position - count:position])
+        next_tokens = estimate_tokens(sentences[position]) + 1
+        assert is_content_boundary(sentences[position - 1]) or tokens + next_tokens > 200
+    assert any(is_content_boundary(chunk['text'].rsplit(". ", 1)[-1]) for chunk in chunks[:-1])
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.cleaning import (
+    PAGE_SEPARATOR, clean_text, collapse_whitespace, dehyphenate, format_cleaning_report,
+    remove_headers_footers, strip_references
+)
+
+
+def make_page(number, body):
+    return f"Journal of Graph Studies, Vol. {number}\n{body}\nPage {number} of 3"
+
+
+def test_running_headers_and_page_numbers_are_removed():
+    pages = [make_page(number, f"Body line {number} about concept maps.") for number in range(1, 4)]
+    cleaned = remove_headers_footers(PAGE_SEPARATOR.join(pages))
+    assert cleaned.split("\n") == [f"Body line {number} about concept maps." for number in range(1, 4)]
+
+
+def test_single_page_text_is_left_alone():
+    text = "Journal of Graph Studies\nBody\nPage 1 of 1"
+    assert remove_headers_footers(text) == text
+
+
+def test_lines_repeated_only_in_the_body_are_kept():
+    pages = [f"Header {number}\nsentence {number}\nRepeated body line\nmore text\nFooter {number}"
+             for number in range(1, 4)]
+    cleaned = remove_headers_footers(PAGE_SEPARATOR.join(pages))
+    assert cleaned.count("Repeated body line") == 3
+    assert "Header" not in cleaned and "Footer" not in cleaned
+
+
+def test_dehyphenate_joins_words_split_across_lines():
+    assert dehyphenate("knowl-\nedge graphs and con­cept") == "knowledge graphs and concept"
+    assert dehyphenate("знан-\nня") == "знання"
+    assert dehyphenate("state-of-the-art\nModels") == "state-of-the-art\nModels"
+    assert dehyphenate("Graph-\nBased") == "Graph-\nBased"
+
+
+def test_collapse_whitespace_normalises_spacing_and_blank_lines():
+    text = "  First \tline  \r\n\r\n\r\n\r\nSecond\fThird   "
+    assert collapse_whitespace(text) == "First line\n\nSecond\nThird"
+
+
+def test_references_are_stripped_only_late_in_the_document():
+    body = "Introduction text. " * 50
+    text = f"Contents\nReferences\n{body}\nReferences\n[1] A. Author. A paper."
+    assert strip_references(text) == f"Contents\nReferences\n{body}".rstrip()
+    early = f"References\n{body}"
+    assert strip_references(early) == early
+    assert strip_references(f"{body}\nСписок використаних джерел:\n1. Джерело") == body.rstrip()
+
+
+def test_clean_text_reports_savings_per_step():
+    pages = [make_page(number, "Knowl-\nedge   graphs " * 20) for number in range(1, 4)]
+    text, report = clean_text(PAGE_SEPARATOR.join(pages) + "\n\nReferences\n[1] Cited work.")
+    assert "Journal" not in text and "References" not in text and "Knowledge graphs" in text
+    assert list(report['steps']) == ["headers_footers", "dehyphenate", "whitespace", "references"]
+    assert report['tokens_before'] - report['tokens_after'] == sum(report['steps'].values())
+    assert format_cleaning_report(report).startswith("cleaning removed ~")
+
+    with pytest.raises(ValueError):
+        clean_text("text", steps=["missing"])
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.dedup import CorpusIndex, MinHasher, estimate_similarity, plan_duplicates
+
+BASE = " ".join(
+    f"Graph neural network layer {i} passes messages between neighbouring nodes and aggregates them."
+    for i in range(12)
+)
+NEAR = BASE.replace("layer 11 passes", "layer 11 sends")
+OTHER = " ".join(
+    f"Protein structure model {i} was trained on databases collected by laboratories worldwide."
+    for i in range(12)
+)
+
+
+def test_signatures_are_stable_and_track_similarity():
+    hasher = MinHasher()
+    assert (hasher.signature(BASE) == MinHasher().signature(BASE)).all()
+    assert estimate_similarity(hasher.signature(BASE), hasher.signature(NEAR)) > 0.7
+    assert estimate_similarity(hasher.signature(BASE), hasher.signature(OTHER)) < 0.2
+    assert hasher.signature("too short") is None
+
+
+def test_plan_maps_near_duplicates_to_first_occurrence():
+    plan = plan_duplicates([(0, BASE), (1, OTHER), (2, NEAR), (3, BASE), (4, "short")])
+    assert plan.duplicates == {2: 0, 3: 0}
+    assert plan.representatives() == {0}
+    assert plan.stored_results == {}
+    assert set(plan.signatures) == {0, 1, 2, 3}
+
+
+def test_plan_reuses_results_stored_by_earlier_runs(tmp_path):
+    index = CorpusIndex("model:request", path=str(tmp_path / "dedup.sqlite3"))
+    index.add(MinHasher().signature(BASE), "graph;neural network")
+
+    plan = plan_duplicates([(0, NEAR), (1, OTHER)], corpus_index=index)
+    assert plan.stored_results == {0: "graph;neural network"}
+    assert plan.duplicates == {}
+
+    other_namespace = CorpusIndex("model:other", path=index.path)
+    assert plan_duplicates([(0, NEAR)], corpus_index=other_namespace).stored_results == {}
+
+
+def test_corpus_index_trims_least_recently_used_entries(tmp_path):
+    hasher = MinHasher()
+    index = CorpusIndex("model:request", path=str(tmp_path / "dedup.sqlite3"), max_entries=2)
+    texts = [BASE, OTHER, BASE.replace("Graph", "Hypergraph")]
+    index.add(hasher.signature(texts[0]), "first")
+    index.add(hasher.signature(texts[1]), "second")
+    assert index.query(hasher.signature(texts[0])) == "first"
+    index.add(hasher.signature(texts[2]), "third")
+
+    assert index.query(hasher.signature(texts[1])) is None
+    assert index.query(hasher.signature(texts[0])) == "first"
+    with closing(sqlite3.connect(index.path)) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 2
+        orphaned = connection.execute(
+            "SELECT COUNT(*) FROM bands WHERE entry_id NOT IN (SELECT id FROM entries)"
+        ).fetchone()[0]
+        assert orphaned == 0
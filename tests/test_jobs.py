@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import PyPDF2
+from config import PDF_PARALLEL_MIN_PAGES
+from utils import jobs
+from utils.converting_documents import iter_pdf_pages
+
+
+def wait_for_job(job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    job = jobs.get_job(job_id)
+    while job['status'] in jobs.ACTIVE_STATUSES and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job = jobs.get_job(job_id)
+    return job
+
+
+def test_cli_worker_runs_registered_handlers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    text_path = tmp_path / "sample.txt"
+    text_path.write_text("Ada Lovelace worked with Charles Babbage on the Analytical Engine.", encoding="utf-8")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    job_id = jobs.submit_job("analysis", {
+        "file_path": str(text_path),
+        "output_dir": str(output_dir),
+        "request_name": "request_related_concepts",
+        "model": "mock-replay",
+    })
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    worker = subprocess.Popen([sys.executable, "-m", "utils.jobs", "--workers", "1"], cwd=tmp_path, env=env)
+    try:
+        job = wait_for_job(job_id)
+    finally:
+        worker.terminate()
+        worker.wait(timeout=10)
+
+    assert job['status'] == 'completed', job['message']
+
+
+def count_pdf_pages(params, job_progress):
+    pages = list(iter_pdf_pages(params['file_path'], workers=2))
+    job_progress.update(pages=len(pages))
+
+
+def test_job_workers_can_extract_pdfs_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_path = tmp_path / "blank.pdf"
+    writer = PyPDF2.PdfWriter()
+    for _ in range(PDF_PARALLEL_MIN_PAGES + 8):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf_path, "wb") as file:
+        writer.write(file)
+
+    jobs.register_job_handler("pdf_pages", count_pdf_pages)
+    job_id = jobs.submit_job("pdf_pages", {"file_path": str(pdf_path)})
+    stop_event = multiprocessing.Event()
+    workers = jobs.start_workers(1, stop_event)
+    try:
+        job = wait_for_job(job_id)
+    finally:
+        jobs.stop_workers(workers, stop_event)
+
+    assert job['status'] == 'completed', job['message']
+    assert job['state']['pages'] == PDF_PARALLEL_MIN_PAGES + 8
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.journal import ChunkJournal, chunk_hash, load_journal
+
+
+def make_chunks(texts):
+    chunks = []
+    start = 0
+    for index, text in enumerate(texts):
+        chunks.append({'index': index, 'text': text, 'start': start, 'end': start + len(text)})
+        start += len(text) + 1
+    return chunks
+
+
+def test_resume_reuses_recorded_chunks(tmp_path):
+    path = str(tmp_path / "journal" / "output.txt.model.jsonl")
+    chunks = make_chunks(["alpha", "beta", "gamma"])
+    journal = ChunkJournal(path, chunks)
+    assert journal.diff == {'unchanged': 0, 'new': 3, 'removed': 0}
+    journal.record(chunks[0], "a;b")
+    journal.record(chunks[1], "b;c")
+    journal.close()
+
+    resumed = ChunkJournal(path, chunks)
+    assert resumed.diff == {'unchanged': 2, 'new': 1, 'removed': 0}
+    assert resumed.get(chunks[0])['result'] == "a;b"
+    assert resumed.get(chunks[1])['result'] == "b;c"
+    assert resumed.get(chunks[2]) is None
+    resumed.close()
+
+
+def test_edit_diffs_by_content_and_moves_offsets(tmp_path):
+    path = str(tmp_path / "output.txt.model.jsonl")
+    chunks = make_chunks(["alpha", "beta", "gamma"])
+    journal = ChunkJournal(path, chunks)
+    for chunk in chunks:
+        journal.record(chunk, chunk['text'].upper())
+    journal.close()
+
+    edited = make_chunks(["inserted", "alpha", "gamma"])
+    resumed = ChunkJournal(path, edited)
+    assert resumed.diff == {'unchanged': 2, 'new': 1, 'removed': 1}
+    moved = resumed.get(edited[1])
+    assert moved['result'] == "ALPHA"
+    assert (moved['index'], moved['start'], moved['end']) == (1, edited[1]['start'], edited[1]['end'])
+    resumed.close()
+
+    entries = load_journal(path)
+    assert set(entries) == {chunk_hash("alpha"), chunk_hash("gamma")}
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    path = str(tmp_path / "output.txt.model.jsonl")
+    chunks = make_chunks(["alpha", "beta"])
+    journal = ChunkJournal(path, chunks)
+    journal.record(chunks[0], "a;b")
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps({'hash': chunk_hash("beta"), 'result': "b;c"})[:20])
+
+    resumed = ChunkJournal(path, chunks)
+    assert resumed.diff == {'unchanged': 1, 'new': 1, 'removed': 0}
+    resumed.record(chunks[1], "b;c")
+    resumed.close()
+    assert set(load_journal(path)) == {chunk_hash("alpha"), chunk_hash("beta")}
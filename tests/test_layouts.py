@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import LAYOUT_SCALING_RATIO
+from utils_viz.layouts import (
+    compute_layout, far_field_repulsion, get_tree_depth, layout_engines, near_field_repulsion
+)
+
+
+def exact_repulsion(positions, mass):
+    delta = positions[:, None, :] - positions[None, :, :]
+    distance2 = np.maximum((delta ** 2).sum(axis=2), 1e-9)
+    strength = LAYOUT_SCALING_RATIO * mass[:, None] * mass[None, :] / distance2
+    np.fill_diagonal(strength, 0)
+    return (delta * strength[:, :, None]).sum(axis=1)
+
+
+def grid_repulsion(positions, mass, depth):
+    forces = np.zeros_like(positions)
+    low = positions.min(axis=0)
+    width = float((positions.max(axis=0) - low).max()) * (1 + 1e-9)
+    far_field_repulsion(positions, mass, low, width, depth, forces)
+    near_field_repulsion(positions, mass, low, width, depth, forces)
+    return forces
+
+
+def two_clusters():
+    left = [f"a{i}" for i in range(12)]
+    right = [f"b{i}" for i in range(12)]
+    edges = [(nodes[i], nodes[j]) for nodes in (left, right) for i in range(12) for j in range(i + 1, 12)]
+    return left, right, edges + [("a0", "b0")]
+
+
+def test_single_level_repulsion_is_exact():
+    generator = np.random.RandomState(0)
+    positions = generator.uniform(-5, 5, size=(12, 2))
+    mass = generator.randint(1, 5, size=12).astype(float)
+    assert get_tree_depth(12) == 1
+    np.testing.assert_allclose(grid_repulsion(positions, mass, 1), exact_repulsion(positions, mass))
+
+
+def test_barnes_hut_repulsion_approximates_exact_forces():
+    generator = np.random.RandomState(1)
+    positions = generator.uniform(-20, 20, size=(400, 2))
+    mass = generator.randint(1, 5, size=400).astype(float)
+    exact = exact_repulsion(positions, mass)
+    approximate = grid_repulsion(positions, mass, get_tree_depth(400))
+    error = np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(error) < 0.1
+
+
+@pytest.mark.parametrize("engine", sorted(layout_engines))
+def test_layout_is_scaled_and_deterministic(engine):
+    left, right, edges = two_clusters()
+    first = compute_layout(left + right, edges, engine, time_budget=60)
+    second = compute_layout(left + right, edges, engine, time_budget=60)
+    assert first == second
+    coordinates = np.array(list(first.values()))
+    assert np.abs(coordinates).max() == pytest.approx(1.0)
+
+
+def test_forceatlas2_keeps_clusters_apart():
+    left, right, edges = two_clusters()
+    layout = compute_layout(left + right, edges, "forceatlas2", time_budget=60)
+    positions = {node: np.array(position) for node, position in layout.items()}
+
+    def mean_distance(group, other):
+        return np.mean([np.linalg.norm(positions[a] - positions[b]) for a in group for b in other if a != b])
+
+    within = (mean_distance(left, left) + mean_distance(right, right)) / 2
+    assert within < mean_distance(left, right) / 2
+
+
+def test_tiny_graphs_are_laid_out():
+    assert compute_layout([], [], "forceatlas2") == {}
+    assert compute_layout(["only"], [], "forceatlas2") == {"only": (0.0, 0.0)}
+    assert len(compute_layout(["a", "b"], [("a", "b")], "forceatlas2")) == 2
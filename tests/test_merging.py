@@ -0,0 +1,54 @@
+import glob
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils_viz.ingestion import load_edge_table
+from utils_viz.merging import merge_contained_nodes
+
+SAMPLE_TABLES = sorted(glob.glob(os.path.join(ROOT, "tables_filtered", "*.txt")))
+
+
+def pairwise_merge(sorted_nodes):
+    merged_mapping = {}
+    for node in sorted_nodes:
+        for existing in sorted_nodes:
+            if existing == node or existing in merged_mapping:
+                continue
+            if existing in node:
+                merged_mapping[existing] = node
+    return merged_mapping
+
+
+def sort_longest_first(nodes):
+    return sorted(nodes, key=lambda x: -len(x))
+
+
+@pytest.mark.parametrize("path", SAMPLE_TABLES, ids=os.path.basename)
+def test_merge_matches_pairwise_scan_on_sample_tables(path):
+    nodes = sort_longest_first(load_edge_table(path).names.tolist())
+    merged = merge_contained_nodes(nodes)
+    assert merged
+    assert list(merged.items()) == list(pairwise_merge(nodes).items())
+
+
+def test_merge_matches_pairwise_scan_on_overlapping_names():
+    rng = random.Random(7)
+    words = ["graph", "net", "network", "work", "node", "no", "de", "edge", "ge", "theory"]
+    nodes = {" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(400)}
+    nodes = sort_longest_first(nodes | {"", "e"})
+    assert list(merge_contained_nodes(nodes).items()) == list(pairwise_merge(nodes).items())
+
+
+def test_names_map_to_first_longest_container():
+    nodes = ["social network analysis", "network analysis", "network", "analysis"]
+    assert merge_contained_nodes(nodes) == {
+        "network analysis": "social network analysis",
+        "network": "social network analysis",
+        "analysis": "social network analysis",
+    }
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import rate_limit
+from utils.rate_limit import ProviderLimiter, call_with_limits, release_unused_tokens
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def get_levels(limiter):
+    return limiter._update(lambda requests, tokens: (requests, tokens, (requests, tokens)))
+
+
+def test_acquire_draws_on_both_buckets(tmp_path):
+    limiter = ProviderLimiter("test", 60, 6000, path=str(tmp_path / "limits.sqlite3"))
+    limiter.acquire(1000)
+    limiter.acquire(500)
+    requests, tokens = get_levels(limiter)
+    assert requests == pytest.approx(58, abs=0.1)
+    assert tokens == pytest.approx(4500, abs=10)
+
+
+def test_refund_returns_tokens_up_to_capacity(tmp_path):
+    limiter = ProviderLimiter("test", 60, 6000, path=str(tmp_path / "limits.sqlite3"))
+    limiter.acquire(3000)
+    limiter.refund_tokens(1000)
+    assert get_levels(limiter)[1] == pytest.approx(4000, abs=10)
+    limiter.refund_tokens(10000)
+    assert get_levels(limiter)[1] == 6000
+    limiter.refund_tokens(-500)
+    assert get_levels(limiter)[1] == 6000
+
+
+def test_budget_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    code = ("from utils.rate_limit import ProviderLimiter; "
+            f"limiter = ProviderLimiter('test', 60, 6000, path={path!r}); "
+            "[limiter.acquire(1000) for _ in range(3)]")
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+    limiter = ProviderLimiter("test", 60, 6000, path=path)
+    requests, tokens = get_levels(limiter)
+    assert requests < 58
+    assert tokens < 3100
+    assert get_levels(ProviderLimiter("other", 60, 6000, path=path)) == (60, 6000)
+
+
+def test_failed_calls_are_retried_and_refunded(tmp_path, monkeypatch):
+    limiter = ProviderLimiter("test", 600, 6000, path=str(tmp_path / "limits.sqlite3"))
+    monkeypatch.setitem(rate_limit.limiters, "test", limiter)
+    monkeypatch.setattr(rate_limit, "get_backoff_delay", lambda attempt, error=None: 0)
+    rate_limit.reset_throttle_state()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise FakeRateLimitError("slow down")
+        return "done"
+
+    assert call_with_limits("test", 1000, flaky) == "done"
+    assert len(calls) == 3
+    assert get_levels(limiter)[1] == pytest.approx(5000, abs=10)
+    assert "2 retries" in rate_limit.get_throttle_status()
+
+    release_unused_tokens("test", 1000, 250)
+    assert get_levels(limiter)[1] == pytest.approx(5750, abs=10)
+    rate_limit.reset_throttle_state()
+
+
+def test_permanent_errors_are_not_retried(tmp_path, monkeypatch):
+    limiter = ProviderLimiter("test", 600, 6000, path=str(tmp_path / "limits.sqlite3"))
+    monkeypatch.setitem(rate_limit.limiters, "test", limiter)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_limits("test", 1000, broken)
+    assert len(calls) == 1
+    assert get_levels(limiter)[1] == pytest.approx(6000, abs=10)
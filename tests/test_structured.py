@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.structured import PairStreamParser, format_pair_line, parse_pairs
+
+DOCUMENT = json.dumps({
+    "related_concepts": [
+        {"source": "graph  theory", "target": "network {analysis}", "relation": "uses \"edges\""},
+        {"source": "Node", "target": "node", "relation": "same"},
+        {"source": "edge", "target": "vertex", "relation": "connects"},
+    ],
+    "hierarchy": [
+        {"source": "mathematics", "target": "graph theory", "relation": "includes"},
+        {"source": "a;b", "target": "c", "relation": ""},
+    ],
+}, indent=2)
+
+
+def test_pairs_are_grouped_by_top_level_key():
+    parser = PairStreamParser()
+    pairs = parser.feed(DOCUMENT)
+    assert pairs == [
+        ("related_concepts", {"source": "graph theory", "target": "network {analysis}", "relation": "uses \"edges\""}),
+        ("related_concepts", {"source": "edge", "target": "vertex", "relation": "connects"}),
+        ("hierarchy", {"source": "mathematics", "target": "graph theory", "relation": "includes"}),
+    ]
+    assert parser.rejected == 2
+
+
+def test_streamed_text_gives_the_same_pairs_as_whole_text():
+    parser = PairStreamParser()
+    streamed = []
+    for position in range(0, len(DOCUMENT), 7):
+        streamed.extend(parser.feed(DOCUMENT[position:position + 7]))
+    assert streamed == PairStreamParser().feed(DOCUMENT)
+    assert len(parser.buffer) < len(DOCUMENT)
+
+
+def test_code_fences_and_prose_are_ignored():
+    text = "Here are the pairs:\n```json\n" + DOCUMENT + "\n```\nLet me know if you need more."
+    assert parse_pairs(text) == parse_pairs(DOCUMENT)
+
+
+def test_truncated_document_keeps_completed_pairs():
+    cut = DOCUMENT.index('"vertex"')
+    sections = parse_pairs(DOCUMENT[:cut])
+    assert sections == {"related_concepts": [
+        {"source": "graph theory", "target": "network {analysis}", "relation": "uses \"edges\""},
+    ]}
+
+
+def test_top_level_array_and_malformed_objects():
+    text = '[{"source": "a", "target": "b"}, {"source": "c", "target": }, {"source": "d", "target": "e"}]'
+    parser = PairStreamParser()
+    pairs = parser.feed(text)
+    assert [pair for _, pair in pairs] == [
+        {"source": "a", "target": "b", "relation": ""},
+        {"source": "d", "target": "e", "relation": ""},
+    ]
+    assert parser.rejected == 1
+    assert format_pair_line(pairs[0][1]) == "a; b"
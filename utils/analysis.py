@@ -1,75 +1,281 @@
-from config_keys import api_groq_key, api_openai_key
-from groq import Groq
-from openai import OpenAI
+import json
+import time
+from config import RECORD_RESPONSES_PATH, LOCAL_BATCH_REPLAY_BACKEND
+from utils.backends import (
+    get_backend, get_backend_for_model, get_structured_output_mode, record_response, supports_batch_api
+)
+from utils.cache import response_cache, make_cache_key
+from utils.chunking import estimate_tokens
+from utils.concurrency import get_provider, get_provider_slots
+from utils.rate_limit import call_with_limits, release_unused_tokens
+from utils.telemetry import metrics, time_call
+from utils.structured import make_pairs_schema
+from utils.batch import register_batch_backend, LocalBatchBackend, OpenAIBatchBackend
 
-client_groq = Groq(api_key=api_groq_key)
-client_openai = OpenAI(api_key=api_openai_key)
 languages = "Ukrainian"
+temperature = 0
+max_tokens = 1024
+
+RELATED_CONCEPTS_SYSTEM = "Format: 'Concept 1; Concept 2'. Each pair on a new line. Provide the answer in {languages}."
+RELATED_CONCEPTS_PROMPT = (
+    "Extract pairs of most related concepts from the text. "
+    "Each concept should be described in no more than 3 words. "
+    "Additionally, include related organizations and speakers"
+    "Return the concepts, speakers in pairs where possible. Text: {text_chunk}"
+)
+
+RELATED_PEOPLE_SYSTEM = "Format: 'Surname 1; Surname 2'. Each pair on a new line. Provide the answer in {languages}."
+RELATED_PEOPLE_PROMPT = (
+    "Extract pairs of most related people with specific surnames from the text. "
+    "Each person should be described in no more than 3 words. Text: {text_chunk}"
+)
+
+INFLUENTIAL_PEOPLE_SYSTEM = "Format: 'Object 1; Object 2'. Result in {languages}"
+INFLUENTIAL_PEOPLE_PROMPT = (
+    "Analyze the provided data and identify related entities, such as companies, speakers, or competitors. "
+    "For each pair of related objects, display the connection in a row, with two objects per row. "
+    "Text: {text_chunk}"
+)
+
+COMBINED_EXTRACTION_SYSTEM = (
+    "Return a JSON object with the keys 'people', 'influential' and 'concepts'. "
+    "Each key holds a list of strings in the format 'Object 1; Object 2'. Provide the answer in {languages}."
+)
+COMBINED_EXTRACTION_PROMPT = (
+    "Extract three kinds of pairs from the text. "
+    "'people': pairs of most related people with specific surnames, each person described in no more than 3 words. "
+    "'influential': pairs of related entities, such as companies, speakers, or competitors. "
+    "'concepts': pairs of most related concepts, including related organizations and speakers, "
+    "each concept described in no more than 3 words. Text: {text_chunk}"
+)
+STRUCTURED_PAIRS_SYSTEM = (
+    "Return a JSON object with the key 'pairs': a list of objects with the keys 'source', 'target' and 'relation'. "
+    "'relation' names how the two are related in no more than 3 words. Provide the answer in {languages}."
+)
+STRUCTURED_COMBINED_SYSTEM = (
+    "Return a JSON object with the keys 'people', 'influential' and 'concepts'. "
+    "Each key holds a list of objects with the keys 'source', 'target' and 'relation'. "
+    "'relation' names how the two are related in no more than 3 words. Provide the answer in {languages}."
+)
+
+COMBINED_SECTIONS = {
+    "people": "request_related_people",
+    "influential": "request_the_most_influential_people",
+    "concepts": "request_related_concepts",
+}
 
 def get_client(model):
-    if model == "llama-3.3-70b-versatile":
-        return client_groq
-    elif model == "gpt-4o-mini":
-        return client_openai
-    else:
-        raise ValueError("Unsupported model")
+    return get_backend_for_model(model).client
+
+REQUEST_TEMPLATES = {
+    "request_related_concepts": {
+        "system": RELATED_CONCEPTS_SYSTEM,
+        "structured_system": STRUCTURED_PAIRS_SYSTEM,
+        "prompt": RELATED_CONCEPTS_PROMPT,
+    },
+    "request_related_people": {
+        "system": RELATED_PEOPLE_SYSTEM,
+        "structured_system": STRUCTURED_PAIRS_SYSTEM,
+        "prompt": RELATED_PEOPLE_PROMPT,
+    },
+    "request_the_most_influential_people": {
+        "system": INFLUENTIAL_PEOPLE_SYSTEM,
+        "structured_system": STRUCTURED_PAIRS_SYSTEM,
+        "prompt": INFLUENTIAL_PEOPLE_PROMPT,
+    },
+    "request_combined_extraction": {
+        "system": COMBINED_EXTRACTION_SYSTEM,
+        "structured_system": STRUCTURED_COMBINED_SYSTEM,
+        "prompt": COMBINED_EXTRACTION_PROMPT,
+        "response_format": {"type": "json_object"},
+    },
+}
+
+def get_batch_client(model):
+    return get_backend_for_model(model).batch_client()
+
+def build_messages(system_template, prompt_template, text_chunk):
+    return [
+        {"role": "system", "content": system_template.format(languages=languages)},
+        {"role": "user", "content": prompt_template.format(text_chunk=text_chunk)}
+    ]
+
+def get_structured_sections(request_name):
+    return list(COMBINED_SECTIONS) if request_name in SECTIONED_REQUESTS else ["pairs"]
+
+def get_response_format(request_name, model, structured=False):
+    if not structured:
+        return REQUEST_TEMPLATES[request_name].get("response_format")
+    mode = get_structured_output_mode(model)
+    if mode == "json_schema":
+        schema = make_pairs_schema(get_structured_sections(request_name))
+        return {"type": "json_schema", "json_schema": {"name": request_name, "strict": True, "schema": schema}}
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+def build_request_body(request_name, text_chunk, model, structured=False):
+    templates = REQUEST_TEMPLATES[request_name]
+    system_template = templates["structured_system"] if structured else templates["system"]
+    body = {
+        "messages": build_messages(system_template, templates["prompt"], text_chunk),
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    response_format = get_response_format(request_name, model, structured)
+    if response_format:
+        body["response_format"] = response_format
+    return body
+
+def get_cache_key(request_name, text_chunk, model, structured=False):
+    templates = REQUEST_TEMPLATES[request_name]
+    system_template = templates["structured_system"] if structured else templates["system"]
+    return make_cache_key(request_name, system_template, templates["prompt"], languages, model, temperature,
+                          max_tokens, get_response_format(request_name, model, structured), text_chunk)
+
+def create_chat_completion(request_name, text_chunk, model, structured=False):
+    cache_key = get_cache_key(request_name, text_chunk, model, structured)
+    cached_result = response_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
 
-def request_related_concepts(text_chunk, model):
     client = get_client(model)
-    prompt = (
-        f"Extract pairs of most related concepts from the text. "
-        f"Each concept should be described in no more than 3 words. "
-        f"Additionally, include related organizations and speakers"
-        f"Return the concepts, speakers in pairs where possible. Text: {text_chunk}"
-    )
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": f"Format: 'Concept 1; Concept 2'. Each pair on a new line. Provide the answer in {languages}."},
-            {"role": "user", "content": prompt}
-        ],
-        model=model,
-        temperature=0,
-        max_tokens=1024,
-    )
-
-    return chat_completion.choices[0].message.content.strip()
+    provider = get_provider(model)
+    body = build_request_body(request_name, text_chunk, model, structured)
+    reserved_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"]) + max_tokens
+    with get_provider_slots(provider):
+        chat_completion, duration = call_with_limits(provider, reserved_tokens, lambda: time_call(
+            model, request_name, lambda: client.chat.completions.create(**body)))
+    usage = getattr(chat_completion, "usage", None)
+    release_unused_tokens(provider, reserved_tokens, getattr(usage, "total_tokens", None))
+    metrics.record_call(model, request_name, "ok", duration,
+                        getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+
+    result = chat_completion.choices[0].message.content.strip()
+    if RECORD_RESPONSES_PATH:
+        record_response(RECORD_RESPONSES_PATH, body, result)
+    response_cache.set(cache_key, result)
+    return result
+
+def stream_chat_completion(request_name, text_chunk, model, structured=False, on_sent=None, cancel_event=None,
+                           on_stream=None):
+    cache_key = get_cache_key(request_name, text_chunk, model, structured)
+    cached_result = response_cache.get(cache_key)
+    if cached_result is not None:
+        yield from cached_result.split("\n")
+        return
 
-def request_related_people(text_chunk, model):
     client = get_client(model)
-    prompt = (
-        f"Extract pairs of most related people with specific surnames from the text. "
-        f"Each person should be described in no more than 3 words. Text: {text_chunk}"
-    )
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": f"Format: 'Surname 1; Surname 2'. Each pair on a new line. Provide the answer in {languages}."},
-            {"role": "user", "content": prompt}
-        ],
-        model=model,
-        temperature=0,
-        max_tokens=1024,
-    )
-
-    return chat_completion.choices[0].message.content.strip()
+    provider = get_provider(model)
+    body = build_request_body(request_name, text_chunk, model, structured)
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+    reserved_tokens = prompt_tokens + max_tokens
+    pending = ""
+    parts = []
+
+    def send():
+        # on_sent fires once the provider slot and rate limiter have let the request through.
+        if on_sent is not None:
+            on_sent()
+        return client.chat.completions.create(**body, stream=True)
+
+    with get_provider_slots(provider):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        stream, duration = call_with_limits(provider, reserved_tokens, lambda: time_call(model, request_name, send))
+        started = time.perf_counter()
+        if on_stream is not None:
+            on_stream(stream)
+        try:
+            for event in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    release_unused_tokens(provider, reserved_tokens, prompt_tokens + estimate_tokens("".join(parts)))
+                    return
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta.content or ""
+                parts.append(delta)
+                pending += delta
+                *lines, pending = pending.split("\n")
+                yield from lines
+        except Exception:
+            release_unused_tokens(provider, reserved_tokens, prompt_tokens + estimate_tokens("".join(parts)))
+            if cancel_event is not None and cancel_event.is_set():
+                # The response was aborted from another thread to cancel this request.
+                return
+            metrics.record_call(model, request_name, "error", duration + time.perf_counter() - started)
+            raise
+        finally:
+            # Also runs when the consumer closes this generator early, so the HTTP response is released.
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+    if pending:
+        yield pending
+
+    result = "".join(parts).strip()
+    duration += time.perf_counter() - started
+    metrics.record_call(model, request_name, "ok", duration, prompt_tokens, estimate_tokens(result))
+    release_unused_tokens(provider, reserved_tokens, prompt_tokens + estimate_tokens(result))
+    if RECORD_RESPONSES_PATH:
+        record_response(RECORD_RESPONSES_PATH, body, result)
+    response_cache.set(cache_key, result)
+
+def request_related_concepts(text_chunk, model):
+    return create_chat_completion("request_related_concepts", text_chunk, model)
+
+def request_related_people(text_chunk, model):
+    return create_chat_completion("request_related_people", text_chunk, model)
 
 def request_the_most_influential_people(text_chunk, model):
-    client = get_client(model)
-    prompt = (
-        "Analyze the provided data and identify related entities, such as companies, speakers, or competitors. "
-        "For each pair of related objects, display the connection in a row, with two objects per row. "
-        f"Text: {text_chunk}"
-    )
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": f"Format: 'Object 1; Object 2'. Result in {languages}"},
-            {"role": "user", "content": prompt}
-        ],
-        model=model,
-        temperature=0,
-        max_tokens=1024,
-    )
-
-    return chat_completion.choices[0].message.content.strip()
\ No newline at end of file
+    return create_chat_completion("request_the_most_influential_people", text_chunk, model)
+
+def request_combined_extraction(text_chunk, model):
+    return create_chat_completion("request_combined_extraction", text_chunk, model)
+
+def parse_json_object(text):
+    text = text.strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+def split_combined_result(result):
+    parsed = parse_json_object(result)
+    sections = {}
+    for key, request_name in COMBINED_SECTIONS.items():
+        pairs = parsed.get(key)
+        lines = []
+        for pair in pairs if isinstance(pairs, list) else []:
+            if isinstance(pair, str):
+                lines.append(pair.strip())
+            elif isinstance(pair, list) and len(pair) == 2:
+                lines.append(f"{pair[0]}; {pair[1]}")
+        sections[request_name] = "\n".join(lines)
+    return sections
+
+SECTIONED_REQUESTS = {
+    "request_combined_extraction": split_combined_result,
+}
+
+def respond_to_batch_request(body):
+    # The local backend is an offline stand-in, so it replays recordings rather than calling the provider.
+    client = get_backend(LOCAL_BATCH_REPLAY_BACKEND).client
+    chat_completion, duration = time_call(body["model"], "batch", lambda: client.chat.completions.create(**body))
+    usage = getattr(chat_completion, "usage", None)
+    metrics.record_call(body["model"], "batch", "ok", duration,
+                        getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+    return chat_completion.choices[0].message.content
+
+register_batch_backend("local", lambda model: LocalBatchBackend(respond_to_batch_request))
+def get_provider_batch_backend(model):
+    if not supports_batch_api(model):
+        raise ValueError(f"{model} has no batch API; use the local batch backend")
+    return OpenAIBatchBackend(get_batch_client(model))
+
+register_batch_backend("openai", get_provider_batch_backend)
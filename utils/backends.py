@@ -0,0 +1,207 @@
+import abc
+import importlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from config import LLM_BACKENDS
+from utils.cache import make_cache_key
+from utils.chunking import estimate_tokens
+from utils.concurrency import get_provider
+from utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+groq = lazy_import("groq")
+openai = lazy_import("openai")
+
+GROQ_OPENAI_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+def get_api_key(settings):
+    if settings.get("api_key_name"):
+        return getattr(importlib.import_module("config_keys"), settings["api_key_name"])
+    return settings.get("api_key")
+
+
+def get_recording_key(body):
+    # The model is left out so responses recorded against one backend replay under another.
+    return make_cache_key(body["messages"], body.get("response_format"))
+
+
+class HTTPBackend(abc.ABC):
+    def __init__(self, name, settings):
+        self.name = name
+        self.settings = settings
+        self._client = None
+        self._batch_client = None
+        self._http_client = None
+        self._lock = threading.Lock()
+
+    def create_http_client(self):
+        return httpx.Client(
+            timeout=httpx.Timeout(self.settings.get("timeout", 60.0)),
+            limits=httpx.Limits(
+                max_connections=self.settings.get("max_connections"),
+                max_keepalive_connections=self.settings.get("max_keepalive_connections"),
+                keepalive_expiry=self.settings.get("keepalive_expiry", 5.0),
+            ),
+        )
+
+    @abc.abstractmethod
+    def create_client(self, http_client):
+        pass
+
+    def get_http_client(self):
+        if self._http_client is None:
+            self._http_client = self.create_http_client()
+        return self._http_client
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.create_client(self.get_http_client())
+            return self._client
+
+    def batch_client(self):
+        return self.client
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._batch_client = None
+            self._http_client = None
+
+
+class OpenAICompatibleBackend(HTTPBackend):
+    def create_client(self, http_client):
+        return openai.OpenAI(api_key=get_api_key(self.settings), base_url=self.settings.get("base_url"),
+                             http_client=http_client)
+
+
+class GroqBackend(HTTPBackend):
+    def create_client(self, http_client):
+        return groq.Groq(api_key=get_api_key(self.settings), base_url=self.settings.get("base_url"),
+                         http_client=http_client)
+
+    def batch_client(self):
+        # The Groq SDK has no batch API, so batches go through its OpenAI-compatible endpoint.
+        with self._lock:
+            if self._batch_client is None:
+                self._batch_client = openai.OpenAI(api_key=get_api_key(self.settings), base_url=GROQ_OPENAI_BASE_URL,
+                                                   http_client=self.get_http_client())
+            return self._batch_client
+
+
+class MockCompletions:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, stream=False, **body):
+        content = self.backend.replay(body)
+        if self.backend.settings.get("latency"):
+            time.sleep(self.backend.settings["latency"])
+        if stream:
+            return self.stream(content)
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=estimate_tokens(content),
+                                total_tokens=prompt_tokens + estimate_tokens(content))
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                               usage=usage)
+
+    def stream(self, content):
+        for line in content.splitlines(keepends=True):
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=line))])
+
+
+class MockBackend:
+    def __init__(self, name, settings):
+        self.name = name
+        self.settings = settings
+        self.recordings = None
+        self._lock = threading.Lock()
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=MockCompletions(self)))
+
+    def load_recordings(self):
+        recordings = {}
+        path = self.settings.get("recordings_path")
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recordings[entry["key"]] = entry["content"]
+        return recordings
+
+    def replay(self, body):
+        with self._lock:
+            if self.recordings is None:
+                self.recordings = self.load_recordings()
+            return self.recordings.get(get_recording_key(body), self.settings.get("default_response", ""))
+
+    def batch_client(self):
+        return self.client
+
+    def close(self):
+        with self._lock:
+            self.recordings = None
+
+
+backend_types = {}
+backends = {}
+backends_lock = threading.Lock()
+recording_lock = threading.Lock()
+
+
+def register_backend_type(type_name, factory):
+    backend_types[type_name] = factory
+
+
+def get_backend(name):
+    with backends_lock:
+        if name not in backends:
+            settings = LLM_BACKENDS.get(name)
+            if settings is None:
+                raise ValueError(f"Unsupported backend: {name}")
+            if settings["type"] not in backend_types:
+                raise ValueError(f"Unsupported backend type: {settings['type']}")
+            backends[name] = backend_types[settings["type"]](name, settings)
+        return backends[name]
+
+
+def get_backend_for_model(model):
+    provider = get_provider(model)
+    if provider not in LLM_BACKENDS:
+        raise ValueError("Unsupported model")
+    return get_backend(provider)
+
+
+def get_structured_output_mode(model):
+    return LLM_BACKENDS.get(get_provider(model), {}).get("structured_output")
+
+
+def supports_batch_api(model):
+    return bool(LLM_BACKENDS.get(get_provider(model), {}).get("batch_api"))
+
+
+def close_backends():
+    with backends_lock:
+        for backend in backends.values():
+            backend.close()
+        backends.clear()
+
+
+def record_response(path, body, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    entry = {"key": get_recording_key(body), "model": body.get("model"), "content": content}
+    with recording_lock, open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+register_backend_type("openai", OpenAICompatibleBackend)
+register_backend_type("groq", GroqBackend)
+register_backend_type("mock", MockBackend)
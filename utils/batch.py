@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import uuid
+from config import BATCH_DIR, BATCH_COMPLETION_WINDOW, BATCH_POLL_INTERVAL
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_file(requests, batch_path):
+    os.makedirs(os.path.dirname(batch_path), exist_ok=True)
+    with open(batch_path, 'w', encoding='utf-8') as file:
+        for custom_id, body in requests:
+            file.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_URL,
+                "body": body,
+            }, ensure_ascii=False) + "\n")
+    return batch_path
+
+
+def read_batch_output(lines):
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        choices = body.get("choices") or []
+        if record.get("error") or response.get("status_code") != 200 or not choices:
+            results[record["custom_id"]] = None
+            continue
+        results[record["custom_id"]] = (choices[0]["message"]["content"] or "").strip()
+    return results
+
+
+class LocalBatchBackend:
+    poll_interval = 1
+
+    def __init__(self, responder, batch_dir=BATCH_DIR):
+        self.responder = responder
+        self.batch_dir = batch_dir
+
+    def _path(self, batch_id, kind):
+        return os.path.join(self.batch_dir, f"{batch_id}.{kind}")
+
+    def submit(self, batch_path):
+        batch_id = f"local-{uuid.uuid4().hex}"
+        os.makedirs(self.batch_dir, exist_ok=True)
+        with open(self._path(batch_id, "status"), 'w', encoding='utf-8') as file:
+            file.write("in_progress")
+        threading.Thread(target=self._run, args=(batch_id, batch_path), daemon=True).start()
+        return batch_id
+
+    def _run(self, batch_id, batch_path):
+        status = "completed"
+        try:
+            with open(batch_path, 'r', encoding='utf-8') as batch_file, \
+                    open(self._path(batch_id, "output.jsonl"), 'w', encoding='utf-8') as output_file:
+                for line in batch_file:
+                    if os.path.exists(self._path(batch_id, "cancel")):
+                        status = "cancelled"
+                        break
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    try:
+                        content = self.responder(request["body"])
+                        record = {
+                            "custom_id": request["custom_id"],
+                            "response": {"status_code": 200, "body": {
+                                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]
+                            }},
+                            "error": None,
+                        }
+                    except Exception as e:
+                        record = {"custom_id": request["custom_id"], "response": None,
+                                  "error": {"message": str(e)}}
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception:
+            status = "failed"
+        with open(self._path(batch_id, "status"), 'w', encoding='utf-8') as file:
+            file.write(status)
+
+    def status(self, batch_id):
+        with open(self._path(batch_id, "status"), 'r', encoding='utf-8') as file:
+            return file.read().strip()
+
+    def cancel(self, batch_id):
+        open(self._path(batch_id, "cancel"), 'w').close()
+
+    def results(self, batch_id):
+        output_path = self._path(batch_id, "output.jsonl")
+        if not os.path.exists(output_path):
+            return {}
+        with open(output_path, 'r', encoding='utf-8') as file:
+            return read_batch_output(file)
+
+
+class OpenAIBatchBackend:
+    poll_interval = BATCH_POLL_INTERVAL
+
+    def __init__(self, client, completion_window=BATCH_COMPLETION_WINDOW):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, batch_path):
+        with open(batch_path, 'rb') as file:
+            input_file = self.client.files.create(file=file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def cancel(self, batch_id):
+        self.client.batches.cancel(batch_id)
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(read_batch_output(self.client.files.content(file_id).text.splitlines()))
+        return results
+
+
+batch_backends = {}
+
+
+def register_batch_backend(name, factory):
+    batch_backends[name] = factory
+
+
+def get_batch_backend(name, model):
+    if name not in batch_backends:
+        raise ValueError(f"Unknown batch backend: {name}")
+    return batch_backends[name](model)
@@ -0,0 +1,119 @@
+import hashlib
+import re
+from config import (
+    CHARS_PER_TOKEN,
+    MODEL_CONTEXT_WINDOWS,
+    DEFAULT_CONTEXT_WINDOW,
+    CHUNK_TOKEN_BUDGETS,
+    DEFAULT_CHUNK_TOKEN_BUDGET,
+    CHUNK_RESERVED_TOKENS,
+    CHUNK_OVERLAP_SENTENCES,
+    CHUNK_CONTENT_DEFINED,
+    CHUNK_MIN_FILL,
+    CHUNK_BOUNDARY_DIVISOR
+)
+
+PARAGRAPH_PATTERN = re.compile(r'\S(?:.*?\S)??(?=\n[ \t\r\f\v]*\n|\s*\Z)', re.DOTALL)
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?…]+["\'»”)\]]*(?=\s)|\Z)', re.DOTALL)
+WORD_PATTERN = re.compile(r'\S+')
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return max(1, int(len(text) / CHARS_PER_TOKEN + 0.5))
+
+
+def get_chunk_token_budget(model):
+    budget = CHUNK_TOKEN_BUDGETS.get(model, DEFAULT_CHUNK_TOKEN_BUDGET)
+    context_window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return max(1, min(budget, context_window - CHUNK_RESERVED_TOKENS))
+
+
+def normalize_whitespace(text):
+    return " ".join(text.split())
+
+
+def split_long_span(text, start, end, token_budget):
+    pieces = []
+    piece_start = None
+    piece_end = None
+    for word in WORD_PATTERN.finditer(text, start, end):
+        if piece_start is None:
+            piece_start = word.start()
+        elif estimate_tokens(text[piece_start:word.end()]) > token_budget:
+            pieces.append((piece_start, piece_end))
+            piece_start = word.start()
+        piece_end = word.end()
+    if piece_start is not None:
+        pieces.append((piece_start, piece_end))
+    return pieces
+
+
+def split_sentences(text, token_budget=None):
+    spans = []
+    for paragraph in PARAGRAPH_PATTERN.finditer(text):
+        paragraph_end = paragraph.end()
+        for sentence in SENTENCE_PATTERN.finditer(text, paragraph.start(), paragraph_end):
+            start, end = sentence.start(), min(sentence.end(), paragraph_end)
+            if start >= paragraph_end:
+                break
+            if token_budget and estimate_tokens(text[start:end]) > token_budget:
+                spans.extend(split_long_span(text, start, end, token_budget))
+            else:
+                spans.append((start, end))
+    return spans
+
+
+def make_chunk(text, spans):
+    start, end = spans[0][0], spans[-1][1]
+    return {
+        'text': " ".join(normalize_whitespace(text[s:e]) for s, e in spans),
+        'start': start,
+        'end': end,
+    }
+
+
+def is_content_boundary(sentence, divisor=CHUNK_BOUNDARY_DIVISOR):
+    digest = hashlib.blake2b(sentence.encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'little') % divisor == 0
+
+
+def carry_overlap(text, current, overlap_sentences):
+    keep = min(overlap_sentences, len(current) - 1) if overlap_sentences > 0 else 0
+    current = current[len(current) - keep:] if keep else []
+    return current, sum(estimate_tokens(normalize_whitespace(text[s:e])) + 1 for s, e in current)
+
+
+def chunk_text(text, token_budget, overlap_sentences=CHUNK_OVERLAP_SENTENCES, content_defined=CHUNK_CONTENT_DEFINED):
+    # With content_defined, a chunk that is at least CHUNK_MIN_FILL full also ends after any sentence
+    # whose hash marks a boundary. Boundaries then depend only on nearby text, so an edit changes
+    # the chunks around it instead of shifting every later chunk.
+    sentences = split_sentences(text, token_budget)
+    min_tokens = token_budget * CHUNK_MIN_FILL
+    chunks = []
+    current = []
+    current_tokens = 0
+    has_new = False
+    for span in sentences:
+        sentence = normalize_whitespace(text[span[0]:span[1]])
+        sentence_tokens = estimate_tokens(sentence) + 1
+        if has_new and current_tokens + sentence_tokens > token_budget:
+            chunks.append(make_chunk(text, current))
+            current, current_tokens = carry_overlap(text, current, overlap_sentences)
+        while current and current_tokens + sentence_tokens > token_budget:
+            removed = current.pop(0)
+            current_tokens -= estimate_tokens(normalize_whitespace(text[removed[0]:removed[1]])) + 1
+        current.append(span)
+        current_tokens += sentence_tokens
+        has_new = True
+        if content_defined and current_tokens >= min_tokens and is_content_boundary(sentence):
+            chunks.append(make_chunk(text, current))
+            current, current_tokens = carry_overlap(text, current, overlap_sentences)
+            has_new = False
+    if has_new:
+        chunks.append(make_chunk(text, current))
+
+    for index, chunk in enumerate(chunks):
+        chunk['index'] = index
+    return chunks
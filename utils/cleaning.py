@@ -0,0 +1,115 @@
+import logging
+import re
+from collections import Counter
+from config import (
+    TEXT_CLEANING_ENABLED,
+    TEXT_CLEANING_STEPS,
+    HEADER_FOOTER_LINES,
+    HEADER_FOOTER_MIN_SHARE,
+    REFERENCES_MIN_POSITION
+)
+from utils.chunking import estimate_tokens
+
+PAGE_SEPARATOR = "\f"
+PAGE_NUMBER_PATTERN = re.compile(
+    r'^[\s\-–—]*(?:page|p\.|стор\.?|сторінка|с\.)?\s*\d+\s*(?:(?:of|/|з|із)\s*\d+)?[\s\-–—]*$', re.IGNORECASE
+)
+DIGITS_PATTERN = re.compile(r'\d+')
+HYPHENATION_PATTERN = re.compile(r'(\w)[-\u2010\u00ad][ \t]*\n[ \t]*([a-zа-яіїєґ])')
+SOFT_HYPHEN_PATTERN = re.compile(r'\u00ad(?!\n)')
+SPACES_PATTERN = re.compile(r'[ \t\v\u00a0\u2000-\u200b]+')
+TRAILING_SPACES_PATTERN = re.compile(r' *\n *')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+REFERENCES_HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:\d+\.?[ \t]*)?(?:references|bibliography|works cited|literature cited|'
+    r'список(?: використаних| використаної)? (?:джерел|літератури)|використані джерела)'
+    r'[ \t]*:?[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+cleaning_steps = {}
+
+
+def register_cleaning_step(name, function):
+    cleaning_steps[name] = function
+
+
+def normalize_line(line):
+    return DIGITS_PATTERN.sub('#', " ".join(line.lower().split()))
+
+
+def get_edge_lines(lines):
+    # Indices of the first and last non-empty lines of a page, where running headers and footers live.
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    count = min(HEADER_FOOTER_LINES, len(filled) // 2)
+    return set(filled[:count] + filled[len(filled) - count:])
+
+
+def remove_headers_footers(text):
+    pages = [page.split("\n") for page in text.split(PAGE_SEPARATOR)]
+    if len(pages) < 2:
+        return text
+    edges = [get_edge_lines(lines) for lines in pages]
+    counts = Counter()
+    for lines, edge in zip(pages, edges):
+        counts.update({normalize_line(lines[index]) for index in edge})
+    min_count = max(2, HEADER_FOOTER_MIN_SHARE * len(pages))
+    cleaned_pages = []
+    for lines, edge in zip(pages, edges):
+        cleaned_pages.append("\n".join(
+            line for index, line in enumerate(lines)
+            if index not in edge or not (counts[normalize_line(line)] >= min_count or PAGE_NUMBER_PATTERN.match(line))
+        ))
+    return "\n".join(cleaned_pages)
+
+
+def dehyphenate(text):
+    return HYPHENATION_PATTERN.sub(r'\1\2', SOFT_HYPHEN_PATTERN.sub('', text))
+
+
+def collapse_whitespace(text):
+    text = SPACES_PATTERN.sub(' ', text.replace(PAGE_SEPARATOR, "\n").replace("\r\n", "\n").replace("\r", "\n"))
+    return BLANK_LINES_PATTERN.sub("\n\n", TRAILING_SPACES_PATTERN.sub("\n", text)).strip()
+
+
+def strip_references(text):
+    # Only a heading in the later part of the document counts, so a table of contents entry is kept.
+    for match in reversed(list(REFERENCES_HEADING_PATTERN.finditer(text))):
+        if match.start() >= len(text) * REFERENCES_MIN_POSITION:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def clean_text(text, steps=None):
+    steps = TEXT_CLEANING_STEPS if steps is None else steps
+    report = {'tokens_before': estimate_tokens(text), 'steps': {}}
+    for name in steps:
+        if name not in cleaning_steps:
+            raise ValueError(f"Unknown cleaning step: {name}")
+        tokens_before_step = estimate_tokens(text)
+        text = cleaning_steps[name](text)
+        report['steps'][name] = tokens_before_step - estimate_tokens(text)
+    report['tokens_after'] = estimate_tokens(text)
+    return text, report
+
+
+def format_cleaning_report(report):
+    removed = report['tokens_before'] - report['tokens_after']
+    share = removed / report['tokens_before'] * 100 if report['tokens_before'] else 0
+    steps = ", ".join(f"{name}: {tokens}" for name, tokens in report['steps'].items())
+    return f"cleaning removed ~{removed} of {report['tokens_before']} tokens ({share:.1f}%; {steps})"
+
+
+def read_clean_text(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = file.read()
+    if not TEXT_CLEANING_ENABLED:
+        return data, None
+    data, report = clean_text(data)
+    logging.info(f"{file_path}: {format_cleaning_report(report)}")
+    return data, report
+
+
+register_cleaning_step("headers_footers", remove_headers_footers)
+register_cleaning_step("dehyphenate", dehyphenate)
+register_cleaning_step("whitespace", collapse_whitespace)
+register_cleaning_step("references", strip_references)
@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import MODEL_PROVIDERS, MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS, JOB_WORKERS
+
+
+def get_provider(model):
+    return MODEL_PROVIDERS.get(model, model)
+
+
+provider_slots = {}
+provider_slots_lock = threading.Lock()
+
+
+def get_max_in_flight(model):
+    return max(1, MAX_CONCURRENT_REQUESTS.get(get_provider(model), DEFAULT_MAX_CONCURRENT_REQUESTS))
+
+
+def get_provider_slots(provider):
+    # Shared by every document processed in this process, so running several files at once
+    # does not multiply the number of requests in flight to one provider. Each of the
+    # JOB_WORKERS processes holds an equal share of the provider's total.
+    with provider_slots_lock:
+        if provider not in provider_slots:
+            total = MAX_CONCURRENT_REQUESTS.get(provider, DEFAULT_MAX_CONCURRENT_REQUESTS)
+            provider_slots[provider] = threading.BoundedSemaphore(max(1, total // max(1, JOB_WORKERS)))
+        return provider_slots[provider]
+
+
+def run_in_order(function, items, max_in_flight, stop_event=None):
+    # Keeps at most max_in_flight calls running and yields (index, result) in input order.
+    # Once stop_event is set no new calls are started; calls already in flight are drained.
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = deque()
+        for index, item in enumerate(items):
+            if stop_event is not None and stop_event.is_set():
+                break
+            pending.append((index, executor.submit(function, item)))
+            if len(pending) >= max_in_flight:
+                done_index, future = pending.popleft()
+                yield done_index, future.result()
+        while pending:
+            done_index, future = pending.popleft()
+            yield done_index, future.result()
@@ -1,7 +1,12 @@
-import PyPDF2
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+from config import PDF_EXTRACTION_WORKERS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES
+from utils.lazy import lazy_import
 import os
 import base64
+
+PyPDF2 = lazy_import("PyPDF2")
+docx = lazy_import("docx")
+
 def read_text_file(file_path):
     if os.path.exists(file_path):
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -12,25 +17,63 @@ def read_text_file(file_path):
 def extract_text_from_pdf(file_path):
     with open(file_path, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+def get_pdf_page_count(file_path):
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def extract_pdf_page_range(file_path, start, end):
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def iter_pdf_pages(file_path, workers=PDF_EXTRACTION_WORKERS):
+    page_count = get_pdf_page_count(file_path)
+    if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+        with open(file_path, 'rb') as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                yield page.extract_text() or ""
+        return
+
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        futures = [executor.submit(extract_pdf_page_range, file_path, start, end) for start, end in ranges]
+        for future in futures:
+            yield from future.result()
+
+def extract_pdf_to_txt(file_path, txt_file_path, workers=PDF_EXTRACTION_WORKERS, progress_callback=None):
+    page_count = get_pdf_page_count(file_path)
+    with open(txt_file_path, 'w', encoding='utf-8') as txt_file:
+        for page_number, page_text in enumerate(iter_pdf_pages(file_path, workers), start=1):
+            if page_number > 1:
+                txt_file.write("\f")
+            txt_file.write(page_text)
+            if progress_callback is not None:
+                progress_callback(page_number, page_count)
+    return txt_file_path
+
+def iter_docx_paragraphs(file_path):
+    for paragraph in docx.Document(file_path).paragraphs:
+        yield paragraph.text
 
 def extract_text_from_docx(file_path):
-    doc = Document(file_path)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text
+    return "".join(text + "\n" for text in iter_docx_paragraphs(file_path))
+
+def extract_docx_to_txt(file_path, txt_file_path):
+    with open(txt_file_path, 'w', encoding='utf-8') as txt_file:
+        for text in iter_docx_paragraphs(file_path):
+            txt_file.write(text + "\n")
+    return txt_file_path
 
-def save_uploaded_file(contents, filename, upload_dir):
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
+def save_uploaded_file(contents, filename, upload_dir, block_size=4 * 65536):
+    content_type, content_string = contents.split(',', 1)
 
-    upload_path = os.path.join(upload_dir, filename)
+    upload_path = os.path.join(upload_dir, os.path.basename(filename))
     with open(upload_path, 'wb') as f:
-        f.write(decoded)
+        for start in range(0, len(content_string), block_size):
+            f.write(base64.b64decode(content_string[start:start + block_size]))
 
     return upload_path
 
@@ -44,22 +87,20 @@ def process_uploaded_file(file_path):
     else:
         return "Unsupported file format."
 
-def convert_to_txt(file_path, upload_dir):
-    if file_path.endswith('.pdf'):
-        text = extract_text_from_pdf(file_path)
-    elif file_path.endswith('.docx'):
-        text = extract_text_from_docx(file_path)
-    elif file_path.endswith('.txt'):
+def convert_to_txt(file_path, upload_dir, progress_callback=None, keep_source=False, txt_filename=None):
+    if file_path.endswith('.txt'):
         return file_path
-    else:
+    if not file_path.endswith(('.pdf', '.docx')):
         return None
 
-    txt_filename = os.path.splitext(os.path.basename(file_path))[0] + '.txt'
+    txt_filename = txt_filename or os.path.splitext(os.path.basename(file_path))[0] + '.txt'
     txt_file_path = os.path.join(upload_dir, txt_filename)
 
-    with open(txt_file_path, 'w', encoding='utf-8') as txt_file:
-        txt_file.write(text)
-    if os.path.exists(file_path):
+    if file_path.endswith('.pdf'):
+        extract_pdf_to_txt(file_path, txt_file_path, progress_callback=progress_callback)
+    else:
+        extract_docx_to_txt(file_path, txt_file_path)
+    if not keep_source and os.path.exists(file_path):
         os.remove(file_path)
 
     return txt_file_path
\ No newline at end of file
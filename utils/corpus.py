@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import (
+    OUTPUT_DIR,
+    CORPUS_FILE_WORKERS,
+    CORPUS_TEXT_DIR,
+    CORPUS_SUMMARY_DIR,
+    MODEL_PROVIDERS,
+    STRUCTURED_OUTPUT,
+    HEDGING_ENABLED
+)
+from utils.converting_documents import convert_to_txt
+from utils.jobs import JobProgress, register_job_handler
+from utils.processing import REQUEST_FUNCTIONS, process_text_chunks
+from utils.rate_limit import reset_throttle_state
+from utils.telemetry import start_job_telemetry, finish_job_telemetry
+from utils.uploads import resolve_corpus_directory
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.docx')
+FILE_COUNTERS = [
+    'chunks_total', 'pairs', 'failed_chunks', 'resumed_chunks', 'dedup_calls_saved', 'dedup_tokens_saved',
+    'cleaning_tokens_before', 'cleaning_tokens_after',
+]
+
+
+def list_corpus_files(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def get_corpus_text_name(file_path, directory):
+    # Output and journal names derive from the text name, so "a.pdf" beside "a.txt",
+    # or files of the same name in other corpora, must not share one.
+    relative_path = os.path.relpath(file_path, directory)
+    digest = hashlib.blake2b(os.path.abspath(file_path).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{digest}_{relative_path.replace(os.sep, '_')}.txt"
+
+
+def prepare_corpus_text(file_path, directory, progress_callback=None):
+    os.makedirs(CORPUS_TEXT_DIR, exist_ok=True)
+    txt_filename = get_corpus_text_name(file_path, directory)
+    if file_path.endswith('.txt'):
+        text_path = os.path.join(CORPUS_TEXT_DIR, txt_filename)
+        shutil.copyfile(file_path, text_path)
+        return text_path
+    return convert_to_txt(file_path, CORPUS_TEXT_DIR, progress_callback, keep_source=True, txt_filename=txt_filename)
+
+
+def analyse_corpus_file(file_path, directory, request_name, model, output_dir, stop_event, stream=False,
+                        structured=STRUCTURED_OUTPUT, hedge=HEDGING_ENABLED, progress_callback=None):
+    entry = {'file': file_path, 'status': 'completed'}
+    if stop_event.is_set():
+        entry['status'] = 'skipped'
+        return entry
+
+    started = time.time()
+    file_progress = JobProgress()
+    file_progress.stop_event = stop_event
+    try:
+        text_path = prepare_corpus_text(file_path, directory, progress_callback)
+        entry['text_file'] = text_path
+        entry['output_file'] = process_text_chunks(text_path, output_dir, REQUEST_FUNCTIONS[request_name], model,
+                                                   file_progress, stream=stream, collect_telemetry=False,
+                                                   structured=structured, hedge=hedge, reset_throttle=False)
+        if stop_event.is_set():
+            entry['status'] = 'cancelled'
+    except Exception as e:
+        logging.error(f"Corpus file {file_path} failed: {e}")
+        entry.update(status='failed', error=str(e))
+    entry.update({name: file_progress.get(name) for name in FILE_COUNTERS})
+    entry['cleaning_report'] = next(iter(file_progress.get('cleaning_reports', {}).values()), None)
+    entry['seconds'] = round(time.time() - started, 3)
+    return entry
+
+
+def make_extraction_callback(job_progress, file_path):
+    name = os.path.basename(file_path)
+
+    def report_pages(pages_done, pages_total):
+        job_progress.update(extracting=f"{name}: page {pages_done}/{pages_total}" if pages_done < pages_total else "")
+
+    return report_pages
+
+
+def build_run_summary(run_id, directory, request_name, model, started, entries, telemetry):
+    statuses = [entry['status'] for entry in entries]
+    return {
+        'run_id': run_id,
+        'directory': directory,
+        'request_name': request_name,
+        'model': model,
+        'started_at': started,
+        'finished_at': time.time(),
+        'seconds': round(time.time() - started, 3),
+        'files': {status: statuses.count(status) for status in sorted(set(statuses))},
+        'totals': {name: sum(entry.get(name, 0) for entry in entries) for name in FILE_COUNTERS},
+        'telemetry': telemetry,
+        'documents': sorted(entries, key=lambda entry: entry['file']),
+    }
+
+
+def write_run_summary(summary, summary_dir=CORPUS_SUMMARY_DIR):
+    os.makedirs(summary_dir, exist_ok=True)
+    summary_path = os.path.join(summary_dir, f"run_{summary['run_id']}.json")
+    with open(summary_path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    return summary_path
+
+
+def run_corpus(directory, request_name, model, output_dir=OUTPUT_DIR, job_progress=None,
+               workers=CORPUS_FILE_WORKERS, stream=False, structured=STRUCTURED_OUTPUT, hedge=HEDGING_ENABLED):
+    job_progress = job_progress or JobProgress()
+    file_paths = list_corpus_files(directory)
+    started = time.time()
+    run_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + f"-{os.getpid()}"
+    job_progress.update(progress=0, message=f"Corpus: 0/{len(file_paths)} files",
+                        files_total=len(file_paths), files_done=0, files_failed=0, pairs=0,
+                        dedup_calls_saved=0, dedup_tokens_saved=0, cleaning_tokens_before=0, cleaning_tokens_after=0)
+
+    entries = []
+    reset_throttle_state()
+    telemetry = start_job_telemetry()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(file_paths)))) as executor:
+            futures = [
+                executor.submit(analyse_corpus_file, file_path, directory, request_name, model, output_dir,
+                                job_progress.stop_event, stream, structured, hedge,
+                                make_extraction_callback(job_progress, file_path))
+                for file_path in file_paths
+            ]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries.append(entry)
+                job_progress.increment(files_done=1, files_failed=int(entry['status'] == 'failed'),
+                                       pairs=entry.get('pairs', 0),
+                                       dedup_calls_saved=entry.get('dedup_calls_saved', 0),
+                                       dedup_tokens_saved=entry.get('dedup_tokens_saved', 0),
+                                       cleaning_tokens_before=entry.get('cleaning_tokens_before', 0),
+                                       cleaning_tokens_after=entry.get('cleaning_tokens_after', 0))
+                job_progress.update(progress=int(len(entries) / len(file_paths) * 100),
+                                    message=f"Corpus: {len(entries)}/{len(file_paths)} files")
+    finally:
+        finish_job_telemetry(telemetry, job_progress)
+
+    summary = build_run_summary(run_id, directory, request_name, model, started, entries,
+                                job_progress.get('telemetry', {}))
+    summary_path = write_run_summary(summary)
+    job_progress.update(message=f"Corpus: {len(entries)}/{len(file_paths)} files, summary in {summary_path}",
+                        summary_path=summary_path)
+    job_progress.flush()
+    return summary_path
+
+
+def run_corpus_job(params, job_progress):
+    run_corpus(resolve_corpus_directory(params['directory']), params['request_name'], params['model'], params.get('output_dir', OUTPUT_DIR),
+               job_progress, params.get('workers', CORPUS_FILE_WORKERS), params.get('stream', False),
+               params.get('structured', STRUCTURED_OUTPUT), params.get('hedge', HEDGING_ENABLED))
+
+
+register_job_handler("corpus", run_corpus_job)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse every document in a folder.")
+    parser.add_argument("directory")
+    parser.add_argument("--request", default="request_combined_extraction", choices=sorted(REQUEST_FUNCTIONS))
+    parser.add_argument("--model", default="llama-3.3-70b-versatile", choices=list(MODEL_PROVIDERS))
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=CORPUS_FILE_WORKERS)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                        help="request typed JSON pairs instead of 'A; B' lines")
+    parser.add_argument("--hedge", action="store_true", default=HEDGING_ENABLED,
+                        help="send slow requests to the backup model as well and keep the first answer")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(run_corpus(args.directory, args.request, args.model, args.output_dir, workers=args.workers,
+                     stream=args.stream, structured=args.structured, hedge=args.hedge))
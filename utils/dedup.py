@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+import numpy as np
+from config import (
+    DEDUP_THRESHOLD, DEDUP_SHINGLE_SIZE, DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_INDEX_PATH, DEDUP_INDEX_MAX_ENTRIES
+)
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def get_shingles(text, size=DEDUP_SHINGLE_SIZE):
+    words = WORD_PATTERN.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def hash_shingle(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+class MinHasher:
+    def __init__(self, num_perm=DEDUP_NUM_PERM, seed=1):
+        # A fixed seed keeps signatures comparable across processes and runs.
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, int(MAX_HASH), size=(num_perm, 1), dtype=np.uint64)
+        self.b = generator.randint(0, int(MAX_HASH), size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text):
+        shingles = get_shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((hash_shingle(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        return (((self.a * hashes + self.b) % MERSENNE_PRIME) & MAX_HASH).min(axis=1)
+
+
+def estimate_similarity(signature, other):
+    return float(np.mean(signature == other))
+
+
+def get_band_keys(signature, bands=DEDUP_BANDS):
+    rows = len(signature) // bands
+    return [
+        f"{band}:{hashlib.sha1(signature[band * rows:(band + 1) * rows].tobytes()).hexdigest()[:16]}"
+        for band in range(bands)
+    ]
+
+
+def find_best_match(signature, candidates, threshold):
+    best_key, best_similarity = None, threshold
+    for key, other in candidates:
+        similarity = estimate_similarity(signature, other)
+        if similarity >= threshold and (best_key is None or similarity > best_similarity):
+            best_key, best_similarity = key, similarity
+    return best_key
+
+
+class LSHIndex:
+    def __init__(self, threshold=DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+        self.positions = {}
+
+    def query(self, signature):
+        keys = {key for band_key in get_band_keys(signature) for key in self.buckets.get(band_key, ())}
+        keys = sorted(keys, key=self.positions.get)
+        return find_best_match(signature, ((key, self.signatures[key]) for key in keys), self.threshold)
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        self.positions[key] = len(self.positions)
+        for band_key in get_band_keys(signature):
+            self.buckets[band_key].append(key)
+
+
+class CorpusIndex:
+    def __init__(self, namespace, path=DEDUP_INDEX_PATH, threshold=DEDUP_THRESHOLD,
+                 max_entries=DEDUP_INDEX_MAX_ENTRIES):
+        self.namespace = namespace
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, signature BLOB NOT NULL, result TEXT NOT NULL, "
+            "last_access REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(entries)")]
+        if "last_access" not in columns:
+            connection.execute("ALTER TABLE entries ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS bands (namespace TEXT NOT NULL, band_key TEXT NOT NULL, entry_id INTEGER NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (namespace, band_key)")
+        connection.execute("CREATE INDEX IF NOT EXISTS bands_entry ON bands (entry_id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        return connection
+
+    def query(self, signature):
+        band_keys = get_band_keys(signature)
+        with self._lock, closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT id, signature, result FROM entries WHERE id IN ("
+                f"SELECT entry_id FROM bands WHERE namespace = ? AND band_key IN ({', '.join('?' * len(band_keys))})"
+                ") ORDER BY id",
+                (self.namespace, *band_keys)
+            ).fetchall()
+            results = {row[0]: row[2] for row in rows}
+            candidates = ((row[0], np.frombuffer(row[1], dtype=np.uint64)) for row in rows)
+            best_id = find_best_match(signature, candidates, self.threshold)
+            if best_id is not None:
+                connection.execute("UPDATE entries SET last_access = ? WHERE id = ?", (time.time(), best_id))
+        return results.get(best_id)
+
+    def add(self, signature, result):
+        with self._lock, closing(self.connect()) as connection:
+            connection.execute("BEGIN")
+            entry_id = connection.execute(
+                "INSERT INTO entries (namespace, signature, result, last_access) VALUES (?, ?, ?, ?)",
+                (self.namespace, signature.tobytes(), result, time.time())
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO bands (namespace, band_key, entry_id) VALUES (?, ?, ?)",
+                [(self.namespace, band_key, entry_id) for band_key in get_band_keys(signature)]
+            )
+            count = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                stale = connection.execute(
+                    "SELECT id FROM entries ORDER BY last_access ASC LIMIT ?", (count - self.max_entries,)
+                ).fetchall()
+                connection.executemany("DELETE FROM bands WHERE entry_id = ?", stale)
+                connection.executemany("DELETE FROM entries WHERE id = ?", stale)
+            connection.execute("COMMIT")
+
+
+class DuplicatePlan:
+    def __init__(self, duplicates, stored_results, signatures):
+        self.duplicates = duplicates
+        self.stored_results = stored_results
+        self.signatures = signatures
+
+    def representatives(self):
+        return set(self.duplicates.values())
+
+
+def plan_duplicates(items, corpus_index=None, hasher=None):
+    # items are (key, text) pairs in dispatch order. Each key is mapped either to an earlier
+    # near-identical item of the same run or to a result stored for a near-identical text of an earlier run.
+    hasher = hasher or MinHasher()
+    local_index = LSHIndex(corpus_index.threshold if corpus_index is not None else DEDUP_THRESHOLD)
+    duplicates = {}
+    stored_results = {}
+    signatures = {}
+    for key, text in items:
+        signature = hasher.signature(text)
+        if signature is None:
+            continue
+        signatures[key] = signature
+        match = local_index.query(signature)
+        if match is not None:
+            duplicates[key] = match
+            continue
+        stored = corpus_index.query(signature) if corpus_index is not None else None
+        if stored is not None:
+            stored_results[key] = stored
+            continue
+        local_index.add(key, signature)
+    return DuplicatePlan(duplicates, stored_results, signatures)
@@ -0,0 +1,164 @@
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import (
+    HEDGE_MODELS,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_INITIAL_DELAY,
+    HEDGE_MIN_DELAY
+)
+from utils.analysis import build_request_body, get_cache_key, stream_chat_completion
+from utils.cache import response_cache
+from utils.chunking import estimate_tokens
+from utils.telemetry import metrics
+
+
+class LatencyTracker:
+    def __init__(self, window=HEDGE_WINDOW):
+        self.window = window
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, duration):
+        with self._lock:
+            self.samples.setdefault(model, deque(maxlen=self.window)).append(duration)
+
+    def get_threshold(self, model):
+        with self._lock:
+            samples = sorted(self.samples.get(model, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_INITIAL_DELAY
+        return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(HEDGE_PERCENTILE * len(samples)))])
+
+
+latency_tracker = LatencyTracker()
+
+
+def abort_stream(stream):
+    # Closing an httpx response does not wake a thread blocked waiting for the next event,
+    # so the socket is shut down; the reading thread then fails and closes the stream itself.
+    response = getattr(stream, "response", None)
+    if response is None:
+        return
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class Attempt:
+    # One side of a hedged request. The request is streamed so that cancelling an attempt can
+    # abort its response at once, even while the provider is stalled between events.
+    def __init__(self, request_name, text_chunk, model, structured):
+        self.request_name = request_name
+        self.text_chunk = text_chunk
+        self.model = model
+        self.structured = structured
+        self.cancel_event = threading.Event()
+        self.sent_event = threading.Event()
+        self.sent_at = None
+        self.response_stream = None
+        self.lines = []
+        self._lock = threading.Lock()
+        messages = build_request_body(request_name, text_chunk, model, structured)["messages"]
+        self.prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+
+    def mark_sent(self):
+        self.sent_at = time.perf_counter()
+        self.sent_event.set()
+
+    def attach_stream(self, response_stream):
+        with self._lock:
+            self.response_stream = response_stream
+            cancelled = self.cancel_event.is_set()
+        if cancelled:
+            abort_stream(response_stream)
+
+    def cancel(self):
+        with self._lock:
+            self.cancel_event.set()
+            response_stream = self.response_stream
+        if response_stream is not None:
+            abort_stream(response_stream)
+
+    def run(self):
+        stream = stream_chat_completion(self.request_name, self.text_chunk, self.model, self.structured,
+                                        on_sent=self.mark_sent, cancel_event=self.cancel_event,
+                                        on_stream=self.attach_stream)
+        try:
+            for line in stream:
+                self.lines.append(line)
+        finally:
+            stream.close()
+            self.sent_event.set()
+        if self.cancel_event.is_set():
+            return None
+        # Only calls that reached the provider are samples; cached answers never call mark_sent.
+        if self.sent_at is not None:
+            latency_tracker.record(self.model, time.perf_counter() - self.sent_at)
+        return "\n".join(self.lines).strip()
+
+    def spent_tokens(self):
+        return self.prompt_tokens + estimate_tokens("\n".join(self.lines))
+
+
+def get_first_result(futures):
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and future.result():
+                return future
+    return None
+
+
+def hedged_completion(request_name, text_chunk, model, structured=False):
+    cached_result = response_cache.get(get_cache_key(request_name, text_chunk, model, structured))
+    if cached_result is not None:
+        return cached_result
+
+    backup_model = HEDGE_MODELS.get(model)
+    primary = Attempt(request_name, text_chunk, model, structured)
+    if backup_model is None:
+        return primary.run()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_future = executor.submit(primary.run)
+        threshold = latency_tracker.get_threshold(model)
+        # Time spent waiting for a provider slot or the rate limiter does not count towards the threshold.
+        primary.sent_event.wait()
+        done, _ = wait([primary_future], timeout=threshold)
+        if done:
+            return primary_future.result()
+
+        backup = Attempt(request_name, text_chunk, backup_model, structured)
+        backup_future = executor.submit(backup.run)
+        metrics.increment("llm_hedges_total", model=model, backup=backup_model)
+        attempts = {primary_future: primary, backup_future: backup}
+        winner = get_first_result(attempts)
+        if winner is None:
+            # Neither side produced an answer; report the primary's outcome as if no hedge had fired.
+            return primary_future.result()
+
+        loser = backup if winner is primary_future else primary
+        loser.cancel()
+        cost = loser.spent_tokens()
+        if winner is backup_future:
+            metrics.increment("llm_hedge_backup_wins_total", model=model, backup=backup_model)
+        metrics.increment("llm_hedge_cost_tokens_total", cost, model=model, backup=backup_model)
+        logging.info(f"Hedged {request_name} on {model} after {threshold:.1f}s with {backup_model}: "
+                     f"{attempts[winner].model} answered first, ~{cost} tokens spent on the cancelled request")
+        return winner.result()
+    finally:
+        executor.shutdown(wait=False)
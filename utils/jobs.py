@@ -0,0 +1,299 @@
+import argparse
+import atexit
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+from config import (
+    JOBS_DB_PATH,
+    JOB_WORKERS,
+    JOB_POLL_INTERVAL,
+    JOB_PROGRESS_FLUSH_INTERVAL,
+    JOB_HANDLER_MODULES,
+    JOB_SHUTDOWN_TIMEOUT
+)
+
+# "waiting" jobs have rescheduled themselves (e.g. to poll a batch) and are claimed again after run_after.
+ACTIVE_STATUSES = {"queued", "running", "waiting"}
+job_handlers = {}
+
+
+def register_job_handler(kind, handler):
+    job_handlers[kind] = handler
+
+
+def connect(db_path=JOBS_DB_PATH):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, "
+        "status TEXT NOT NULL, progress INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL DEFAULT '{}', "
+        "message TEXT NOT NULL DEFAULT '', cancel_requested INTEGER NOT NULL DEFAULT 0, "
+        "worker_pid INTEGER, created_at REAL NOT NULL, started_at REAL, finished_at REAL, run_after REAL)"
+    )
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(jobs)")]
+    if "run_after" not in columns:
+        connection.execute("ALTER TABLE jobs ADD COLUMN run_after REAL")
+    connection.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+    return connection
+
+
+def row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['state'] = json.loads(job['state'])
+    return job
+
+
+def submit_job(kind, params):
+    job_id = uuid.uuid4().hex
+    with closing(connect()) as connection:
+        connection.execute(
+            "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(params, ensure_ascii=False), time.time())
+        )
+    return job_id
+
+
+def get_job(job_id):
+    with closing(connect()) as connection:
+        return row_to_job(connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def list_jobs(limit=50):
+    with closing(connect()) as connection:
+        rows = connection.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [row_to_job(row) for row in rows]
+
+
+def request_cancel(job_id):
+    with closing(connect()) as connection:
+        connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        connection.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        )
+        # A waiting job runs once more right away so it can wind down what it started.
+        connection.execute("UPDATE jobs SET run_after = ? WHERE id = ? AND status = 'waiting'", (time.time(), job_id))
+
+
+def is_cancel_requested(job_id):
+    with closing(connect()) as connection:
+        row = connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return bool(row and row[0])
+
+
+def update_job(job_id, **fields):
+    if 'state' in fields:
+        fields['state'] = json.dumps(fields['state'], ensure_ascii=False)
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with closing(connect()) as connection:
+        connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def claim_next_job(worker_pid):
+    connection = connect()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'waiting' AND run_after <= ?) "
+            "ORDER BY created_at LIMIT 1",
+            (time.time(),)
+        ).fetchone()
+        if row is None:
+            connection.execute("COMMIT")
+            return None
+        connection.execute(
+            "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ? WHERE id = ?",
+            (worker_pid, time.time(), row['id'])
+        )
+        connection.execute("COMMIT")
+        job = row_to_job(row)
+        job['status'] = 'running'
+        return job
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+
+class JobProgress:
+    def __init__(self, job_id=None, state=None):
+        # A requeued job starts from the state it had saved, e.g. an already submitted batch.
+        self.job_id = job_id
+        self.stop_event = threading.Event()
+        self.progress = 0
+        self.state = dict(state or {})
+        self.message = ""
+        self.run_after = None
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+
+    def reschedule(self, delay):
+        # The handler has returned early and wants to run again in delay seconds,
+        # without holding a worker in between.
+        self.run_after = time.time() + delay
+
+    def update(self, progress=None, message=None, **state):
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+            if message is not None:
+                self.message = message
+            self.state.update(state)
+        self._maybe_flush()
+
+    def increment(self, **counters):
+        with self._lock:
+            for name, amount in counters.items():
+                self.state[name] = self.state.get(name, 0) + amount
+        self._maybe_flush()
+
+    def get(self, name, default=0):
+        with self._lock:
+            return self.state.get(name, default)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= JOB_PROGRESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        if self.job_id is None:
+            return
+        with self._lock:
+            progress, message, state = self.progress, self.message, dict(self.state)
+        update_job(self.job_id, progress=progress, message=message, state=state)
+        if is_cancel_requested(self.job_id):
+            self.stop_event.set()
+
+
+def watch_cancellation(job_progress, done_event):
+    while not done_event.wait(JOB_POLL_INTERVAL):
+        if is_cancel_requested(job_progress.job_id):
+            job_progress.stop_event.set()
+            return
+
+
+def run_job(job):
+    job_progress = JobProgress(job['id'], job['state'])
+    if job['cancel_requested']:
+        job_progress.stop_event.set()
+    done_event = threading.Event()
+    threading.Thread(target=watch_cancellation, args=(job_progress, done_event)).start()
+    try:
+        handler = job_handlers[job['kind']]
+        handler(job['params'], job_progress)
+        if job_progress.run_after is not None:
+            status = 'waiting'
+        else:
+            status = 'cancelled' if job_progress.stop_event.is_set() else 'completed'
+    except Exception as e:
+        logging.error(f"Job {job['id']} failed: {e}")
+        job_progress.update(message=f"Failed: {e}")
+        status = 'failed'
+    finally:
+        done_event.set()
+    job_progress.flush()
+    if status == 'waiting':
+        update_job(job['id'], status=status, run_after=job_progress.run_after, worker_pid=None)
+    else:
+        update_job(job['id'], status=status, finished_at=time.time())
+    return status
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def requeue_orphaned_jobs():
+    with closing(connect()) as connection:
+        rows = connection.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall()
+        for row in rows:
+            if not is_process_alive(row['worker_pid']):
+                connection.execute(
+                    "UPDATE jobs SET status = 'queued', worker_pid = NULL WHERE id = ? AND status = 'running'",
+                    (row['id'],)
+                )
+
+
+def load_job_handlers():
+    for module_name in JOB_HANDLER_MODULES:
+        importlib.import_module(module_name)
+
+
+def run_worker(stop_event=None):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    load_job_handlers()
+    pid = os.getpid()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            job = claim_next_job(pid)
+            if job is None:
+                if stop_event is None:
+                    time.sleep(JOB_POLL_INTERVAL)
+                else:
+                    stop_event.wait(JOB_POLL_INTERVAL)
+                continue
+            run_job(job)
+    except KeyboardInterrupt:
+        pass
+
+
+def stop_workers(workers, stop_event, timeout=JOB_SHUTDOWN_TIMEOUT):
+    stop_event.set()
+    deadline = time.monotonic() + timeout
+    for worker in workers:
+        worker.join(max(0.0, deadline - time.monotonic()))
+    for worker in workers:
+        if worker.is_alive():
+            # A job still running is requeued by requeue_orphaned_jobs on the next start.
+            worker.terminate()
+            worker.join()
+
+
+def start_workers(count=JOB_WORKERS, stop_event=None):
+    # Workers are not daemonic because jobs start process pools of their own
+    # (parallel PDF extraction), so they are stopped explicitly at exit.
+    requeue_orphaned_jobs()
+    stop_event = stop_event or multiprocessing.Event()
+    workers = []
+    for _ in range(count):
+        worker = multiprocessing.Process(target=run_worker, args=(stop_event,))
+        worker.start()
+        workers.append(worker)
+    atexit.register(stop_workers, workers, stop_event)
+    return workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ConnexaData analysis job workers.")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    args = parser.parse_args()
+    # Handlers register themselves on the importable utils.jobs module, not on
+    # this __main__ copy, so the workers have to run from that module.
+    jobs = importlib.import_module("utils.jobs")
+    # Turn SIGTERM into a normal exit so the atexit shutdown stops the workers.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    for worker in jobs.start_workers(args.workers):
+        worker.join()
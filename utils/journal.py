@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+from config import JOURNAL_DIR
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_journal_path(output_filename, model, structured=False):
+    suffix = ".structured" if structured else ""
+    return os.path.join(JOURNAL_DIR, f"{output_filename}.{model}{suffix}.jsonl")
+
+
+def load_journal(journal_path):
+    entries = {}
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry['hash']] = entry
+    return entries
+
+
+def ends_with_newline(journal_path):
+    if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+        return True
+    with open(journal_path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+
+class ChunkJournal:
+    # Results are keyed by the chunk's content hash, so chunks that survive an edit of the
+    # document are reused wherever they now appear and only new or changed chunks are sent again.
+    def __init__(self, journal_path, chunks):
+        self.path = journal_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+
+        hashes = {chunk_hash(chunk['text']): chunk for chunk in chunks}
+        previous = load_journal(journal_path)
+        self.completed = {}
+        for hash_value, entry in previous.items():
+            chunk = hashes.get(hash_value)
+            if chunk is not None:
+                self.completed[hash_value] = {**entry, 'index': chunk['index'], 'start': chunk['start'],
+                                              'end': chunk['end']}
+        self.diff = {
+            'unchanged': len(self.completed),
+            'new': len(hashes) - len(self.completed),
+            'removed': len(previous) - len(self.completed),
+        }
+        # A run killed mid-write leaves a partial last line that new entries would be appended to.
+        if self.completed != previous or not ends_with_newline(journal_path):
+            self._rewrite()
+        self._file = open(journal_path, 'a', encoding='utf-8')
+
+    def _rewrite(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            for entry in sorted(self.completed.values(), key=lambda entry: entry['index']):
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temporary_path, self.path)
+
+    def get(self, chunk):
+        return self.completed.get(chunk_hash(chunk['text']))
+
+    def record(self, chunk, result):
+        entry = {
+            'index': chunk['index'],
+            'hash': chunk_hash(chunk['text']),
+            'start': chunk['start'],
+            'end': chunk['end'],
+            'result': result,
+        }
+        with self._lock:
+            self.completed[entry['hash']] = entry
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
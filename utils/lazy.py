@@ -0,0 +1,38 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def preload(*names):
+    for name in names:
+        importlib.import_module(name)
+
+
+def preload_in_background(*names):
+    thread = threading.Thread(target=preload, args=names, daemon=True)
+    thread.start()
+    return thread
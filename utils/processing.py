@@ -0,0 +1,427 @@
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import Future
+from contextlib import ExitStack
+from config import (
+    OUTPUT_DIR,
+    FILTERED_OUTPUT_DIR,
+    BATCH_DIR,
+    BATCH_BACKEND,
+    DEDUP_ENABLED,
+    STRUCTURED_OUTPUT,
+    HEDGING_ENABLED,
+    RETRY_MAX_ATTEMPTS
+)
+from utils.analysis import *
+from utils.concurrency import run_in_order, get_max_in_flight
+from utils.cache import response_cache
+from utils.chunking import chunk_text, get_chunk_token_budget, estimate_tokens
+from utils.rate_limit import (
+    get_throttle_status, reset_throttle_state, is_transient_error, get_backoff_delay, record_retry
+)
+from utils.journal import ChunkJournal, get_journal_path
+from utils.batch import write_batch_file, get_batch_backend, TERMINAL_STATUSES
+from utils.streaming import OrderedLineWriter
+from utils.dedup import CorpusIndex, plan_duplicates
+from utils.cleaning import read_clean_text, format_cleaning_report
+from utils.telemetry import metrics, start_job_telemetry, finish_job_telemetry
+from utils.structured import PairStreamParser, format_pair_line
+from utils.hedging import hedged_completion
+from utils.jobs import JobProgress, register_job_handler
+
+REQUEST_FUNCTIONS = {
+    "request_related_people": request_related_people,
+    "request_the_most_influential_people": request_the_most_influential_people,
+    "request_related_concepts": request_related_concepts,
+    "request_combined_extraction": request_combined_extraction,
+}
+
+def filter_row(row):
+    cleaned_row = re.sub(r'^\d+\.\s*', '', row)
+    cleaned_row = re.sub(r'^-\s*', '', cleaned_row)
+    cleaned_row = re.sub(r'[^a-zA-Zа-яА-Я\s;]', '', cleaned_row)
+    cleaned_row = cleaned_row.strip()
+    if ';' not in cleaned_row:
+        return False
+    parts = cleaned_row.split(';')
+    if len(parts) != 2:
+        return False
+    for part in parts:
+        part = part.strip()
+        if not part or len(part.split()) > 3:
+            return False
+    return True
+
+def record_filtered_lines(request_name, accepted, rejected):
+    if accepted:
+        metrics.increment("pairs_accepted_total", accepted, request=request_name)
+    if rejected:
+        metrics.increment("pairs_rejected_total", rejected, request=request_name)
+
+def make_counting_filter(request_name, structured=False):
+    # Structured pairs are validated while parsing, so every line that reaches the writer is kept.
+    def accept(row):
+        accepted = bool(row.strip()) if structured else filter_row(row)
+        if row.strip():
+            record_filtered_lines(request_name, int(accepted), int(not accepted))
+        return accepted
+    return accept
+
+def get_output_paths(file_path, output_dir, request_name):
+    original_filename = os.path.basename(file_path)
+    output_file = os.path.join(output_dir, f"output_{request_name}_{original_filename}")
+    section_names = list(COMBINED_SECTIONS.values()) if request_name in SECTIONED_REQUESTS else [request_name]
+    filtered_output_files = {
+        name: os.path.join(FILTERED_OUTPUT_DIR, f"filtered_output_{name}_{original_filename}")
+        for name in section_names
+    }
+    return output_file, filtered_output_files
+
+def open_output_files(stack, output_file, filtered_output_files):
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    os.makedirs(FILTERED_OUTPUT_DIR, exist_ok=True)
+    output = stack.enter_context(open(output_file, "w", encoding='utf-8'))
+    filtered_files = {
+        name: stack.enter_context(open(path, "w", encoding='utf-8'))
+        for name, path in filtered_output_files.items()
+    }
+    return output, filtered_files
+
+def split_structured_result(request_name, result):
+    parser = PairStreamParser()
+    sections = {}
+    for key, pair in parser.feed(result):
+        name = COMBINED_SECTIONS.get(key) if request_name in SECTIONED_REQUESTS else request_name
+        if name is not None:
+            sections.setdefault(name, []).append(pair)
+    return sections, parser.rejected
+
+def write_structured_pairs(output_file, sections):
+    for name, pairs in sections.items():
+        for pair in pairs:
+            output_file.write(json.dumps({"section": name, **pair}, ensure_ascii=False) + "\n")
+
+def write_structured_result(output_file, filtered_files, request_name, result):
+    sections, rejected = split_structured_result(request_name, result)
+    write_structured_pairs(output_file, sections)
+    record_filtered_lines(request_name, 0, rejected)
+    accepted = 0
+    for name, filtered_file in filtered_files.items():
+        lines = [format_pair_line(pair) for pair in sections.get(name, [])]
+        record_filtered_lines(name, len(lines), 0)
+        accepted += len(lines)
+        filtered_file.write("\n".join(lines) + "\n")
+    return accepted
+
+def write_chunk_result(output_file, filtered_files, request_name, result, structured=False):
+    if structured:
+        return write_structured_result(output_file, filtered_files, request_name, result)
+    output_file.write(result + "\n")
+    split_result = SECTIONED_REQUESTS.get(request_name)
+    sections = split_result(result) if split_result else {request_name: result}
+    accepted = 0
+    for name, filtered_file in filtered_files.items():
+        section = sections.get(name, "")
+        lines = [line for line in section.split("\n") if line.strip()]
+        accepted_lines = [line for line in lines if filter_row(line)]
+        record_filtered_lines(name, len(accepted_lines), len(lines) - len(accepted_lines))
+        accepted += len(accepted_lines)
+        filtered_file.write("\n".join(accepted_lines) + "\n")
+    return accepted
+
+def get_corpus_index(request_name, model, structured=False):
+    # Results are only reusable for the same prompt templates and model settings.
+    return CorpusIndex(get_cache_key(request_name, "", model, structured))
+
+def plan_chunk_duplicates(items, request_name, model, structured=False):
+    if not DEDUP_ENABLED:
+        return None, None
+    corpus_index = get_corpus_index(request_name, model, structured)
+    return plan_duplicates(items, corpus_index), corpus_index
+
+def estimate_saved_tokens(request_name, text_chunk, model, result, structured=False):
+    messages = build_request_body(request_name, text_chunk, model, structured)["messages"]
+    return sum(estimate_tokens(message["content"]) for message in messages) + estimate_tokens(result)
+
+def format_dedup_summary(calls_saved, tokens_saved):
+    return f"near-duplicate chunks reused: {calls_saved}, ~{tokens_saved} tokens saved"
+
+def read_chunks(file_path, model, token_budget=None, job_progress=None):
+    data, report = read_clean_text(file_path)
+    if report is not None and job_progress is not None:
+        job_progress.increment(cleaning_tokens_before=report['tokens_before'],
+                               cleaning_tokens_after=report['tokens_after'])
+        cleaning_reports = dict(job_progress.get('cleaning_reports', {}))
+        cleaning_reports[os.path.basename(file_path)] = format_cleaning_report(report)
+        job_progress.update(cleaning_reports=cleaning_reports)
+    return chunk_text(data, token_budget or get_chunk_token_budget(model))
+
+def process_text_chunks(file_path, output_dir, request_function, model, job_progress=None,
+                        token_budget=None, stream=False, collect_telemetry=True, structured=STRUCTURED_OUTPUT,
+                        hedge=HEDGING_ENABLED, reset_throttle=True):
+    job_progress = job_progress or JobProgress()
+    stop_event = job_progress.stop_event
+    if reset_throttle:
+        reset_throttle_state()
+    cache_start = response_cache.stats()
+    request_name = request_function.__name__
+    stream = stream and request_name not in SECTIONED_REQUESTS
+    original_filename = os.path.basename(file_path)
+    output_file, filtered_output_files = get_output_paths(file_path, output_dir, request_name)
+    job_progress.update(progress=0, chunks_done=0, chunks_total=0, pairs=0, failed_chunks=0, resumed_chunks=0,
+                        dedup_calls_saved=0, dedup_tokens_saved=0, cleaning_tokens_before=0, cleaning_tokens_after=0,
+                        cleaning_reports={})
+
+    journal = None
+    writer = None
+    plan = None
+    telemetry = start_job_telemetry() if collect_telemetry else None
+    representative_results = {}
+
+    def stream_lines(index, lines):
+        collected = []
+        parser = PairStreamParser() if structured else None
+        for line in lines:
+            collected.append(line)
+            if parser is None:
+                writer.write_line(index, line)
+                continue
+            for _, pair in parser.feed(line + "\n"):
+                writer.write_line(index, format_pair_line(pair))
+        if parser is not None:
+            record_filtered_lines(request_name, 0, parser.rejected)
+        return "\n".join(collected).strip()
+
+    def stream_chunk(index, text_chunk):
+        # A stream that breaks mid-way is retried from the start; its partial lines are dropped.
+        for attempt in range(RETRY_MAX_ATTEMPTS + 1):
+            try:
+                return stream_lines(index, stream_chat_completion(request_name, text_chunk, model, structured))
+            except Exception as error:
+                writer.discard(index)
+                if not is_transient_error(error) or attempt == RETRY_MAX_ATTEMPTS:
+                    raise
+                delay = get_backoff_delay(attempt, error)
+                record_retry(get_provider(model), error, delay)
+                time.sleep(delay)
+
+    def get_duplicate_result(index):
+        if plan is None:
+            return None
+        if index in plan.stored_results:
+            return plan.stored_results[index]
+        if index in plan.duplicates:
+            # The representative comes earlier in the input, so it has already been dispatched.
+            return representative_results[plan.duplicates[index]].result()
+        return None
+
+    def analyse_chunk(chunk):
+        index = chunk['index']
+        result, source = None, 'live'
+        try:
+            entry = journal.get(chunk)
+            duplicate_result = get_duplicate_result(index) if entry is None else None
+            if entry is not None or duplicate_result is not None:
+                result, source = (entry['result'], 'resumed') if entry is not None else (duplicate_result, 'duplicate')
+                if writer is not None:
+                    stream_lines(index, result.split("\n"))
+            elif writer is not None:
+                result = stream_chunk(index, chunk['text'])
+            elif hedge:
+                result = hedged_completion(request_name, chunk['text'], model, structured)
+            elif structured:
+                result = create_chat_completion(request_name, chunk['text'], model, structured=True)
+            else:
+                result = request_function(chunk['text'], model)
+        except Exception as e:
+            logging.error(f"Chunk {index} of {original_filename} failed: {e}")
+            result = None
+            if writer is not None:
+                writer.discard(index)
+        finally:
+            if index in representative_results:
+                representative_results[index].set_result(result)
+            if writer is not None:
+                writer.finish(index)
+        return result, source
+
+    try:
+        chunks = read_chunks(file_path, model, token_budget, job_progress)
+        total_chunks = len(chunks)
+        job_progress.update(chunks_total=total_chunks)
+        journal = ChunkJournal(get_journal_path(os.path.basename(output_file), model, structured), chunks)
+        if journal.diff['unchanged'] or journal.diff['removed']:
+            job_progress.update(chunks_unchanged=journal.diff['unchanged'], chunks_new=journal.diff['new'],
+                                chunks_removed=journal.diff['removed'])
+        plan, corpus_index = plan_chunk_duplicates(
+            ((chunk['index'], chunk['text']) for chunk in chunks), request_name, model, structured
+        )
+        if plan is not None:
+            representative_results = {index: Future() for index in plan.representatives()}
+
+        with ExitStack() as stack:
+            output, filtered_files = open_output_files(stack, output_file, filtered_output_files)
+            if stream:
+                writer = OrderedLineWriter(filtered_files[request_name], make_counting_filter(request_name, structured),
+                                           lambda: job_progress.increment(pairs=1))
+            results = run_in_order(analyse_chunk, chunks, get_max_in_flight(model), stop_event)
+            for i, (result, source) in results:
+                if result is None:
+                    job_progress.increment(failed_chunks=1)
+                    result = ""
+                elif source == 'resumed':
+                    job_progress.increment(resumed_chunks=1)
+                else:
+                    journal.record(chunks[i], result)
+                    if source == 'duplicate':
+                        job_progress.increment(
+                            dedup_calls_saved=1,
+                            dedup_tokens_saved=estimate_saved_tokens(request_name, chunks[i]['text'], model, result,
+                                                                     structured)
+                        )
+                    elif plan is not None and i in plan.signatures:
+                        corpus_index.add(plan.signatures[i], result)
+                if writer is not None and structured:
+                    write_structured_pairs(output, split_structured_result(request_name, result)[0])
+                elif writer is not None:
+                    output.write(result + "\n")
+                else:
+                    job_progress.increment(
+                        pairs=write_chunk_result(output, filtered_files, request_name, result, structured)
+                    )
+                cache_stats = response_cache.stats()
+                job_progress.update(
+                    progress=int((i + 1) / total_chunks * 100),
+                    chunks_done=i + 1,
+                    cache_hits=cache_stats['hits'] - cache_start['hits'],
+                    cache_misses=cache_stats['misses'] - cache_start['misses'],
+                    throttle=get_throttle_status()
+                )
+        logging.info(f"{original_filename}: " + format_dedup_summary(
+            job_progress.get('dedup_calls_saved'), job_progress.get('dedup_tokens_saved')))
+    finally:
+        if journal is not None:
+            journal.close()
+        if telemetry is not None:
+            finish_job_telemetry(telemetry, job_progress)
+        job_progress.flush()
+    return output_file
+
+def poll_batch(backend, batch_id, job_progress):
+    # Returns the batch status once it is final. Until then the job reschedules itself, so no
+    # worker is held for the batch window; a stopped job cancels the batch and still collects
+    # whatever the backend finished.
+    status = backend.status(batch_id)
+    if status in TERMINAL_STATUSES:
+        return status
+    if job_progress.stop_event.is_set() and not job_progress.get('batch_cancel_requested', False):
+        backend.cancel(batch_id)
+        job_progress.update(batch_cancel_requested=True)
+    if job_progress.get('batch_cancel_requested', False):
+        job_progress.update(message=f"Batch {batch_id}: cancelling, partial results are collected once it stops")
+    else:
+        job_progress.update(message=f"Batch {batch_id}: {status}")
+    job_progress.reschedule(backend.poll_interval)
+    return None
+
+def process_text_chunks_batch(file_paths, output_dir, request_function, model, job_progress=None,
+                              backend_name=BATCH_BACKEND, structured=STRUCTURED_OUTPUT):
+    # The first run submits the batch and later runs of the same job poll it; None is returned
+    # until the batch is final and its results have been written.
+    job_progress = job_progress or JobProgress()
+    request_name = request_function.__name__
+    backend = get_batch_backend(backend_name, model)
+    batch_id = job_progress.get('batch_id', None)
+    status = None
+    if batch_id is not None:
+        status = poll_batch(backend, batch_id, job_progress)
+        if status is None:
+            return None
+
+    message = "Preparing batch..." if batch_id is None else f"Batch {batch_id}: collecting results..."
+    job_progress.update(progress=0, message=message, failed_chunks=0,
+                        dedup_calls_saved=0, dedup_tokens_saved=0, cleaning_tokens_before=0, cleaning_tokens_after=0,
+                        cleaning_reports={})
+    telemetry = start_job_telemetry()
+    try:
+        documents = [
+            (file_path, read_chunks(file_path, model, job_progress=job_progress)) for file_path in file_paths
+        ]
+        texts = {
+            f"{document_index}-{chunk['index']}": chunk['text']
+            for document_index, (file_path, chunks) in enumerate(documents)
+            for chunk in chunks
+        }
+        plan, corpus_index = plan_chunk_duplicates(texts.items(), request_name, model, structured)
+        reused = set(plan.duplicates) | set(plan.stored_results) if plan is not None else set()
+        if batch_id is None:
+            if job_progress.stop_event.is_set():
+                return None
+            requests = [
+                (custom_id, build_request_body(request_name, text, model, structured))
+                for custom_id, text in texts.items() if custom_id not in reused
+            ]
+            batch_path = os.path.join(BATCH_DIR, f"{request_name}_{model}_{int(time.time())}.jsonl")
+            write_batch_file(requests, batch_path)
+            batch_id = backend.submit(batch_path)
+            # Saved at once, so a job requeued after a restart polls this batch instead of paying for another.
+            job_progress.update(message=f"Batch {batch_id}: submitted {len(requests)} requests", batch_id=batch_id)
+            job_progress.reschedule(backend.poll_interval)
+            return None
+
+        results = backend.results(batch_id)
+        failed_chunks = 0
+        for document_index, (file_path, chunks) in enumerate(documents):
+            output_file, filtered_output_files = get_output_paths(file_path, output_dir, request_name)
+            with ExitStack() as stack:
+                output, filtered_files = open_output_files(stack, output_file, filtered_output_files)
+                for chunk in chunks:
+                    custom_id = f"{document_index}-{chunk['index']}"
+                    # The plan is rebuilt on collection, so it may now reuse chunks the batch has answered.
+                    if custom_id in reused and custom_id not in results:
+                        result = plan.stored_results.get(custom_id, results.get(plan.duplicates.get(custom_id)))
+                        if result is not None:
+                            job_progress.increment(
+                                dedup_calls_saved=1,
+                                dedup_tokens_saved=estimate_saved_tokens(request_name, chunk['text'], model, result,
+                                                                         structured)
+                            )
+                    else:
+                        result = results.get(custom_id)
+                        if result is not None:
+                            response_cache.set(get_cache_key(request_name, chunk['text'], model, structured), result)
+                            if plan is not None and custom_id in plan.signatures:
+                                corpus_index.add(plan.signatures[custom_id], result)
+                    if result is None:
+                        failed_chunks += 1
+                        result = ""
+                    job_progress.increment(
+                        pairs=write_chunk_result(output, filtered_files, request_name, result, structured)
+                    )
+            job_progress.update(progress=int((document_index + 1) / len(documents) * 100), failed_chunks=failed_chunks)
+        job_progress.update(
+            message=f"Batch {batch_id}: {status}, {len(texts) - failed_chunks}/{len(texts)} chunks written, "
+                    + format_dedup_summary(job_progress.get('dedup_calls_saved'), job_progress.get('dedup_tokens_saved'))
+        )
+        return batch_id
+    finally:
+        finish_job_telemetry(telemetry, job_progress)
+        job_progress.flush()
+
+def run_analysis_job(params, job_progress):
+    process_text_chunks(params['file_path'], params.get('output_dir', OUTPUT_DIR),
+                        REQUEST_FUNCTIONS[params['request_name']], params['model'], job_progress,
+                        stream=params.get('stream', False), structured=params.get('structured', STRUCTURED_OUTPUT),
+                        hedge=params.get('hedge', HEDGING_ENABLED))
+
+def run_batch_job(params, job_progress):
+    process_text_chunks_batch(params['file_paths'], params.get('output_dir', OUTPUT_DIR),
+                              REQUEST_FUNCTIONS[params['request_name']], params['model'], job_progress,
+                              backend_name=params.get('backend', BATCH_BACKEND),
+                              structured=params.get('structured', STRUCTURED_OUTPUT))
+
+register_job_handler("analysis", run_analysis_job)
+register_job_handler("batch", run_batch_job)
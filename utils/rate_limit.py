@@ -0,0 +1,182 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from config import PROVIDER_RATE_LIMITS, RATE_LIMIT_DB_PATH, RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+from utils.telemetry import metrics
+
+TRANSIENT_ERROR_NAMES = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+    "TimeoutException",
+    "TimeoutError",
+    "ConnectionError",
+    "TransportError",
+}
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ProviderLimiter:
+    # The request and token buckets live in SQLite so every job worker process
+    # (and any CLI run) draws on the one per-provider budget.
+    def __init__(self, provider, requests_per_minute, tokens_per_minute, path=RATE_LIMIT_DB_PATH):
+        self.provider = provider
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.path = path
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "provider TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        return connection
+
+    def _update(self, change):
+        # Refills both buckets to the current time, then applies change(requests, tokens),
+        # which returns the new levels and a result, in one write transaction.
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT requests, tokens, updated FROM buckets WHERE provider = ?", (self.provider,)
+                ).fetchone()
+                requests, tokens = self.request_capacity, self.token_capacity
+                if row is not None:
+                    elapsed = max(0.0, now - row[2])
+                    requests = min(self.request_capacity, row[0] + elapsed * self.request_capacity / 60)
+                    tokens = min(self.token_capacity, row[1] + elapsed * self.token_capacity / 60)
+                requests, tokens, result = change(requests, tokens)
+                connection.execute(
+                    "INSERT OR REPLACE INTO buckets (provider, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (self.provider, requests, tokens, now)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return result
+
+    def acquire(self, token_count):
+        token_count = min(float(token_count), self.token_capacity)
+
+        def take(requests, tokens):
+            wait = max(0.0, (1 - requests) * 60 / self.request_capacity,
+                       (token_count - tokens) * 60 / self.token_capacity)
+            if wait == 0:
+                return requests - 1, tokens - token_count, 0.0
+            return requests, tokens, wait
+
+        while True:
+            wait = self._update(take)
+            if wait == 0:
+                return
+            set_throttle_state(self.provider, 'waiting for quota', wait)
+            time.sleep(min(wait, 5.0))
+
+    def refund_tokens(self, token_count):
+        amount = max(0.0, float(token_count))
+        self._update(lambda requests, tokens: (requests, min(self.token_capacity, tokens + amount), None))
+
+
+limiters = {}
+limiters_lock = threading.Lock()
+throttle_state = {}
+throttle_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    with limiters_lock:
+        if provider not in limiters:
+            limits = PROVIDER_RATE_LIMITS.get(provider)
+            limiters[provider] = ProviderLimiter(
+                provider, limits['requests_per_minute'], limits['tokens_per_minute']
+            ) if limits else None
+        return limiters[provider]
+
+
+def set_throttle_state(provider, reason, delay):
+    with throttle_lock:
+        state = throttle_state.setdefault(provider, {'retries': 0, 'reason': '', 'until': 0.0})
+        state['reason'] = reason
+        state['until'] = max(state['until'], time.time() + delay)
+
+
+def record_retry(provider, error, delay):
+    with throttle_lock:
+        state = throttle_state.setdefault(provider, {'retries': 0, 'reason': '', 'until': 0.0})
+        state['retries'] += 1
+    metrics.increment("llm_retries_total", provider=provider)
+    set_throttle_state(provider, f"retrying after {type(error).__name__}", delay)
+
+
+def get_throttle_status():
+    now = time.time()
+    messages = []
+    with throttle_lock:
+        for provider, state in throttle_state.items():
+            if state['until'] > now:
+                messages.append(f"{provider}: {state['reason']} ({state['until'] - now:.0f}s)")
+            elif state['retries']:
+                messages.append(f"{provider}: {state['retries']} retries")
+    return "; ".join(messages)
+
+
+def reset_throttle_state():
+    with throttle_lock:
+        throttle_state.clear()
+
+
+def is_transient_error(error):
+    if getattr(error, 'status_code', None) in TRANSIENT_STATUS_CODES:
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def get_retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff_delay(attempt, error=None):
+    retry_after = get_retry_after(error) if error is not None else None
+    if retry_after is not None:
+        return min(RETRY_MAX_DELAY, retry_after)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def call_with_limits(provider, token_count, function):
+    limiter = get_limiter(provider)
+    for attempt in range(RETRY_MAX_ATTEMPTS + 1):
+        if limiter is not None:
+            limiter.acquire(token_count)
+        try:
+            return function()
+        except Exception as error:
+            # A failed attempt consumed none of the tokens reserved for it.
+            release_unused_tokens(provider, token_count, 0)
+            if not is_transient_error(error) or attempt == RETRY_MAX_ATTEMPTS:
+                raise
+            delay = get_backoff_delay(attempt, error)
+            record_retry(provider, error, delay)
+            time.sleep(delay)
+
+
+def release_unused_tokens(provider, reserved_tokens, used_tokens):
+    limiter = get_limiter(provider)
+    if limiter is not None and used_tokens is not None:
+        limiter.refund_tokens(reserved_tokens - used_tokens)
@@ -0,0 +1,40 @@
+import threading
+
+
+class OrderedLineWriter:
+    # Lines are held per chunk until its stream has finished, so a failed or retried
+    # stream never leaves a partial chunk behind; finished chunks are written in input order.
+    def __init__(self, file, accept, on_accept=None):
+        self.file = file
+        self.accept = accept
+        self.on_accept = on_accept
+        self.next_index = 0
+        self.pending = {}
+        self.finished = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, line):
+        self.file.write(line + "\n")
+
+    def write_line(self, index, line):
+        with self._lock:
+            self.pending.setdefault(index, []).append(line)
+
+    def discard(self, index):
+        with self._lock:
+            self.pending.pop(index, None)
+
+    def finish(self, index):
+        with self._lock:
+            lines = self.pending.pop(index, [])
+        accepted = [line for line in lines if self.accept(line)]
+        with self._lock:
+            if self.on_accept is not None:
+                for _ in accepted:
+                    self.on_accept()
+            self.finished[index] = accepted
+            while self.next_index in self.finished:
+                for line in self.finished.pop(self.next_index):
+                    self._emit(line)
+                self.next_index += 1
+            self.file.flush()
@@ -0,0 +1,124 @@
+import json
+
+PAIR_FIELDS = ("source", "target", "relation")
+PAIR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "source": {"type": "string"},
+        "target": {"type": "string"},
+        "relation": {"type": "string"},
+    },
+    "required": list(PAIR_FIELDS),
+    "additionalProperties": False,
+}
+
+
+def make_pairs_schema(sections):
+    return {
+        "type": "object",
+        "properties": {section: {"type": "array", "items": PAIR_SCHEMA} for section in sections},
+        "required": list(sections),
+        "additionalProperties": False,
+    }
+
+
+def clean_pair(value):
+    if not isinstance(value, dict):
+        return None
+    source, target = value.get("source"), value.get("target")
+    if not isinstance(source, str) or not isinstance(target, str):
+        return None
+    source, target = " ".join(source.split()), " ".join(target.split())
+    if not source or not target or source.lower() == target.lower() or ";" in source + target:
+        return None
+    relation = value.get("relation")
+    return {"source": source, "target": target, "relation": " ".join(relation.split()) if isinstance(relation, str) else ""}
+
+
+class PairStreamParser:
+    # Scans JSON text as it arrives and returns each pair object of a top-level array, or of an array
+    # under a top-level key (returned with that key), as soon as its closing brace is seen. Text outside
+    # the JSON, code fences and a truncated tail are ignored, so the pairs that did arrive are kept even
+    # when the whole document does not parse.
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.key = None
+        self.string_start = None
+        self.last_string = None
+        self.object_start = None
+        self.buffer = ""
+        self.position = 0
+        self.rejected = 0
+
+    def feed(self, text):
+        self.buffer += text
+        pairs = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = self.buffer[self.string_start:self.position + 1]
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.position
+            elif char == ":" and len(self.stack) == 1 and self.last_string is not None:
+                try:
+                    self.key = json.loads(self.last_string)
+                except json.JSONDecodeError:
+                    self.key = None
+            elif char in "{[":
+                self.stack.append(char)
+                if self.stack in (["[", "{"], ["{", "[", "{"]):
+                    self.object_start = self.position
+            elif char in "}]":
+                if char == "}" and self.object_start is not None and self.stack in (["[", "{"], ["{", "[", "{"]):
+                    pair = self.parse_object(self.buffer[self.object_start:self.position + 1])
+                    if pair is not None:
+                        pairs.append((self.key, pair))
+                    self.object_start = None
+                if self.stack:
+                    self.stack.pop()
+            self.position += 1
+        self.compact()
+        return pairs
+
+    def parse_object(self, text):
+        try:
+            pair = clean_pair(json.loads(text))
+        except json.JSONDecodeError:
+            pair = None
+        if pair is None:
+            self.rejected += 1
+        return pair
+
+    def compact(self):
+        # Drops text that can no longer be part of a pending object or key.
+        keep_from = min(
+            position for position in (self.object_start, self.string_start if self.in_string else None, self.position)
+            if position is not None
+        )
+        if keep_from > 0:
+            self.buffer = self.buffer[keep_from:]
+            self.position -= keep_from
+            if self.object_start is not None:
+                self.object_start -= keep_from
+            if self.string_start is not None:
+                self.string_start -= keep_from
+
+
+def parse_pairs(text):
+    sections = {}
+    for key, pair in PairStreamParser().feed(text):
+        sections.setdefault(key, []).append(pair)
+    return sections
+
+
+def format_pair_line(pair):
+    return f"{pair['source']}; {pair['target']}"
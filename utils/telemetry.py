@@ -0,0 +1,238 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from flask import Response
+from config import METRICS_DB_PATH, METRICS_FLUSH_INTERVAL, LATENCY_BUCKETS
+
+METRICS = {
+    "llm_requests_total": ("counter", "LLM completion calls by outcome."),
+    "llm_request_duration_seconds": ("histogram", "Duration of LLM completion calls."),
+    "llm_prompt_tokens_total": ("counter", "Prompt tokens sent to the model."),
+    "llm_completion_tokens_total": ("counter", "Completion tokens returned by the model."),
+    "llm_retries_total": ("counter", "Retries after transient provider errors."),
+    "llm_hedges_total": ("counter", "Duplicate requests sent to a backup model after a slow call."),
+    "llm_hedge_backup_wins_total": ("counter", "Hedged requests answered first by the backup model."),
+    "llm_hedge_cost_tokens_total": ("counter", "Estimated tokens spent on the cancelled side of hedged requests."),
+    "pairs_accepted_total": ("counter", "Result lines accepted by filter_row."),
+    "pairs_rejected_total": ("counter", "Result lines rejected by filter_row."),
+}
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BUCKET_LABEL_PATTERN = re.compile(r'(?:^|,)le="([^"]*)"$')
+
+
+def format_labels(labels):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in sorted(labels.items())
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+class JobTelemetry:
+    # Collects the calls made while one job runs, for the summary stored with the job.
+    def __init__(self):
+        self.latencies = []
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def record_call(self, duration, failed):
+        with self._lock:
+            self.latencies.append(duration)
+            if failed:
+                self.counters["llm_errors"] += 1
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            counters = dict(self.counters)
+
+        def percentile(share):
+            return round(latencies[min(len(latencies) - 1, int(share * len(latencies)))], 3) if latencies else None
+
+        return {
+            'calls': int(counters.get("llm_requests_total", 0)),
+            'errors': int(counters.get("llm_errors", 0)),
+            'retries': int(counters.get("llm_retries_total", 0)),
+            'hedges': int(counters.get("llm_hedges_total", 0)),
+            'hedge_backup_wins': int(counters.get("llm_hedge_backup_wins_total", 0)),
+            'hedge_cost_tokens': int(counters.get("llm_hedge_cost_tokens_total", 0)),
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_total': round(sum(latencies), 3),
+            'prompt_tokens': int(counters.get("llm_prompt_tokens_total", 0)),
+            'completion_tokens': int(counters.get("llm_completion_tokens_total", 0)),
+            'pairs_accepted': int(counters.get("pairs_accepted_total", 0)),
+            'pairs_rejected': int(counters.get("pairs_rejected_total", 0)),
+        }
+
+
+class MetricsStore:
+    # Metrics are buffered in memory and added to a SQLite table shared by the web app and the
+    # job worker processes, so /metrics reports calls made in every process.
+    def __init__(self, path=METRICS_DB_PATH, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(float)
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            "name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels))"
+        )
+        return connection
+
+    def _add(self, name, labels, amount, le=None):
+        key = format_labels(labels)
+        if le is not None:
+            # le is kept last so buckets of one series sort together.
+            key = f'{key},le="{le}"' if key else f'le="{le}"'
+        self.pending[(name, key)] += amount
+
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            self._add(name, labels, amount)
+            for collector in self.collectors:
+                collector.record(name, amount)
+        self._maybe_flush()
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            for bucket in LATENCY_BUCKETS:
+                if value <= bucket:
+                    self._add(f"{name}_bucket", labels, 1, le=str(bucket))
+            self._add(f"{name}_bucket", labels, 1, le="+Inf")
+            self._add(f"{name}_sum", labels, value)
+            self._add(f"{name}_count", labels, 1)
+        self._maybe_flush()
+
+    def record_call(self, model, request_name, status, duration, prompt_tokens=0, completion_tokens=0):
+        labels = {'model': model, 'request': request_name}
+        self.increment("llm_requests_total", status=status, **labels)
+        self.observe("llm_request_duration_seconds", duration, **labels)
+        if prompt_tokens:
+            self.increment("llm_prompt_tokens_total", prompt_tokens, **labels)
+        if completion_tokens:
+            self.increment("llm_completion_tokens_total", completion_tokens, **labels)
+        with self._lock:
+            for collector in self.collectors:
+                collector.record_call(duration, status != "ok")
+
+    def add_collector(self, collector):
+        with self._lock:
+            self.collectors.append(collector)
+
+    def remove_collector(self, collector):
+        with self._lock:
+            self.collectors.remove(collector)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, defaultdict(float)
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                [(name, labels, value) for (name, labels), value in pending.items()]
+            )
+            connection.execute("COMMIT")
+
+    def read(self):
+        self.flush()
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT name, labels, value FROM metrics").fetchall()
+
+    def reset(self):
+        with self._lock:
+            self.pending.clear()
+        with closing(self.connect()) as connection:
+            connection.execute("DELETE FROM metrics")
+
+
+metrics = MetricsStore()
+atexit.register(metrics.flush)
+
+
+def time_call(model, request_name, function):
+    # Failed calls are recorded here; the caller records successful ones once the token counts are known.
+    start = time.perf_counter()
+    try:
+        response = function()
+    except Exception:
+        metrics.record_call(model, request_name, "error", time.perf_counter() - start)
+        raise
+    return response, time.perf_counter() - start
+
+
+def start_job_telemetry():
+    collector = JobTelemetry()
+    metrics.add_collector(collector)
+    return collector
+
+
+def finish_job_telemetry(collector, job_progress):
+    metrics.remove_collector(collector)
+    metrics.flush()
+    job_progress.update(telemetry=collector.summary())
+
+
+def get_metric_family(name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and METRICS.get(name[:-len(suffix)], ("",))[0] == "histogram":
+            return name[:-len(suffix)]
+    return name
+
+
+def get_sort_key(row):
+    name, labels, _ = row
+    match = BUCKET_LABEL_PATTERN.search(labels)
+    if match is None:
+        return labels, name, 0.0
+    return labels[:match.start()], name, float(match.group(1))
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_metrics():
+    families = defaultdict(list)
+    for row in metrics.read():
+        families[get_metric_family(row[0])].append(row)
+    lines = []
+    for family, (metric_type, help_text) in METRICS.items():
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for name, labels, value in sorted(families.get(family, []), key=get_sort_key):
+            lines.append(f"{name}{{{labels}}} {format_value(value)}" if labels else f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics_route(server):
+    @server.route("/metrics")
+    def metrics_endpoint():
+        return Response(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,117 @@
+import os
+import re
+import threading
+from flask import request, jsonify
+from config import TEXT_FILE_PATH, UPLOAD_PARTIAL_DIR, UPLOAD_MAX_BYTES, CORPUS_ROOTS
+from utils.converting_documents import convert_to_txt
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{8,64}$')
+ALLOWED_EXTENSIONS = ('.txt', '.pdf', '.docx')
+COPY_BLOCK_SIZE = 65536
+conversion_progress = {}
+conversion_progress_lock = threading.Lock()
+
+
+def get_partial_path(upload_id):
+    return os.path.join(UPLOAD_PARTIAL_DIR, f"{upload_id}.part")
+
+
+def clean_upload_filename(filename):
+    filename = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not filename or filename.startswith('.') or not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        return None
+    return filename
+
+
+def resolve_corpus_directory(directory, roots=CORPUS_ROOTS):
+    # Real paths on both sides, so symlinks and ".." cannot reach outside the allowed roots.
+    resolved = os.path.realpath(directory)
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([resolved, root]) == root:
+            if not os.path.isdir(resolved):
+                raise ValueError(f"Not a folder: {directory}")
+            return resolved
+    raise ValueError(f"Corpus folders must be inside: {', '.join(roots)}")
+
+
+def write_upload_chunk(upload_id, offset, stream):
+    os.makedirs(UPLOAD_PARTIAL_DIR, exist_ok=True)
+    partial_path = get_partial_path(upload_id)
+    size = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    if offset > size:
+        raise ValueError(f"Expected offset {size}, got {offset}")
+
+    with open(partial_path, 'r+b' if size else 'wb') as file:
+        file.seek(offset)
+        file.truncate()
+        written = offset
+        while True:
+            block = stream.read(COPY_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > UPLOAD_MAX_BYTES:
+                raise ValueError("Upload is too large")
+            file.write(block)
+    return written
+
+
+def complete_upload(upload_id, filename):
+    partial_path = get_partial_path(upload_id)
+    if not os.path.exists(partial_path):
+        raise ValueError("Unknown upload")
+    text_dir = os.path.dirname(TEXT_FILE_PATH)
+    upload_path = os.path.join(text_dir, filename)
+    os.replace(partial_path, upload_path)
+
+    def report_pages(pages_done, pages_total):
+        with conversion_progress_lock:
+            conversion_progress[upload_id] = {'pages_done': pages_done, 'pages_total': pages_total}
+
+    try:
+        converted_file_path = convert_to_txt(upload_path, text_dir, progress_callback=report_pages)
+    finally:
+        with conversion_progress_lock:
+            conversion_progress.pop(upload_id, None)
+    if converted_file_path is None:
+        raise ValueError("Unsupported file format")
+    return os.path.basename(converted_file_path)
+
+
+def register_upload_routes(server):
+    @server.route('/upload/chunk', methods=['POST'])
+    def upload_chunk():
+        upload_id = request.args.get('upload_id', '')
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return jsonify({'error': 'Invalid upload id'}), 400
+        try:
+            offset = int(request.args.get('offset', '0'))
+            size = write_upload_chunk(upload_id, offset, request.stream)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'upload_id': upload_id, 'size': size})
+
+    @server.route('/upload/status', methods=['GET'])
+    def upload_status():
+        upload_id = request.args.get('upload_id', '')
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return jsonify({'error': 'Invalid upload id'}), 400
+        with conversion_progress_lock:
+            progress = dict(conversion_progress.get(upload_id, {}))
+        return jsonify(progress)
+
+    @server.route('/upload/complete', methods=['POST'])
+    def upload_complete():
+        payload = request.get_json(silent=True) or {}
+        upload_id = payload.get('upload_id', '')
+        filename = clean_upload_filename(payload.get('filename'))
+        if not UPLOAD_ID_PATTERN.match(upload_id) or filename is None:
+            return jsonify({'error': 'Invalid upload'}), 400
+        try:
+            converted_filename = complete_upload(upload_id, filename)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'file': converted_filename})
+
+    return server
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from config import (
+    GRAPH_CACHE_ENABLED, GRAPH_CACHE_MAX_ENTRIES, GRAPH_CACHE_DISK_ENABLED,
+    GRAPH_CACHE_PATH, GRAPH_CACHE_DISK_MAX_ENTRIES
+)
+from utils.cache import make_cache_key
+
+_content_hashes = {}
+_content_hashes_lock = threading.Lock()
+
+
+def file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    marker = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    with _content_hashes_lock:
+        digest = _content_hashes.get(marker)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        with _content_hashes_lock:
+            _content_hashes[marker] = digest
+    return digest
+
+
+class GraphCache:
+    def __init__(self, max_entries, disk_path=None, disk_max_entries=0, enabled=True):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.disk_path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS artefacts ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        return connection
+
+    def _remember(self, key, payload):
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT value FROM artefacts WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE artefacts SET last_access = ? WHERE key = ?", (time.time(), key))
+                connection.commit()
+        return row[0] if row else None
+
+    def _write_disk(self, key, payload):
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO artefacts (key, value, last_access) VALUES (?, ?, ?)",
+                (key, payload, time.time())
+            )
+            count = connection.execute("SELECT COUNT(*) FROM artefacts").fetchone()[0]
+            if count > self.disk_max_entries:
+                connection.execute(
+                    "DELETE FROM artefacts WHERE key IN "
+                    "(SELECT key FROM artefacts ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.disk_max_entries,)
+                )
+            connection.commit()
+
+    def get(self, key):
+        # Values are kept pickled so every caller gets its own copy to mutate.
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(payload)
+        if self.disk_path:
+            payload = self._read_disk(key)
+            if payload is not None:
+                with self._lock:
+                    self._remember(key, payload)
+                    self.disk_hits += 1
+                return pickle.loads(payload)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, payload)
+        if self.disk_path:
+            self._write_disk(key, payload)
+
+    def fetch(self, stage, key_parts, build):
+        """Return the ``stage`` artefact for ``key_parts``, building it on a miss."""
+        if not self.enabled:
+            return build()
+        key = make_cache_key(stage, *key_parts)
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.disk_path and os.path.exists(self.disk_path):
+            with closing(self._connect()) as connection:
+                connection.execute("DELETE FROM artefacts")
+                connection.commit()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._entries)}
+
+
+graph_cache = GraphCache(
+    GRAPH_CACHE_MAX_ENTRIES,
+    GRAPH_CACHE_PATH if GRAPH_CACHE_DISK_ENABLED else None,
+    GRAPH_CACHE_DISK_MAX_ENTRIES,
+    GRAPH_CACHE_ENABLED
+)
@@ -0,0 +1,83 @@
+import os
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+PAIR_COLUMNS = ["object_1", "object_2"]
+
+
+class EdgeTable:
+    def __init__(self, names, edges, degrees):
+        # names[i] is the label of node i, edges holds one (source, target) row
+        # of node ids per distinct undirected pair, in first-seen order.
+        self.names = names
+        self.edges = edges
+        self.degrees = degrees
+
+    def __len__(self):
+        return len(self.names)
+
+    def edge_names(self):
+        return self.names[self.edges]
+
+    def degree_dict(self):
+        return dict(zip(self.names.tolist(), self.degrees.tolist()))
+
+
+def read_pairs(source):
+    # A pair is a line with exactly two ';'-separated fields, as in the line-by-line readers this
+    # replaced; names such as "NA" and quote characters are kept as written and a blank field is "".
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as file:
+            lines = file.read().splitlines()
+    else:
+        lines = source.read().splitlines()
+    rows = pd.Series(lines, dtype=object)
+    rows = rows[rows.str.count(';') == 1]
+    if rows.empty:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in PAIR_COLUMNS})
+    fields = rows.str.split(';', n=1, expand=True)
+    return pd.DataFrame({"object_1": fields[0], "object_2": fields[1]}).reset_index(drop=True)
+
+
+def clean_names(column, lower=True):
+    names = column.astype(str).str.strip()
+    return names.str.lower() if lower else names
+
+
+def collapse_edges(codes, num_nodes):
+    codes = codes[codes[:, 0] != codes[:, 1]]
+    low = np.minimum(codes[:, 0], codes[:, 1]).astype(np.int64)
+    high = np.maximum(codes[:, 0], codes[:, 1]).astype(np.int64)
+    _, first = np.unique(low * max(num_nodes, 1) + high, return_index=True)
+    first.sort()
+    return codes[first]
+
+
+def count_degrees(edges, num_nodes):
+    return np.bincount(edges.ravel(), minlength=num_nodes)
+
+
+def build_edge_table(sources, targets):
+    # Interleaving keeps node ids in the order a row-by-row scan would meet them.
+    pairs = np.column_stack([np.asarray(sources, dtype=object), np.asarray(targets, dtype=object)])
+    codes, names = pd.factorize(pairs.ravel())
+    names = np.asarray(names, dtype=object)
+    edges = collapse_edges(codes.reshape(-1, 2), len(names))
+    return EdgeTable(names, edges, count_degrees(edges, len(names)))
+
+
+def remap_edge_table(table, mapping):
+    """Fold nodes into others given ``mapping`` from name to replacement name."""
+    index = {name: i for i, name in enumerate(table.names.tolist())}
+    remap = np.array([index[mapping.get(name, name)] for name in table.names.tolist()], dtype=np.intp)
+    edges = collapse_edges(remap[table.edges], len(table))
+    return EdgeTable(table.names, edges, count_degrees(edges, len(table)))
+
+
+def load_edge_table(source, lower=True):
+    data = read_pairs(source)
+    sources, targets = clean_names(data["object_1"], lower), clean_names(data["object_2"], lower)
+    keep = (sources != "") & (targets != "")
+    return build_edge_table(sources[keep], targets[keep])
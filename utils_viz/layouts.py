@@ -0,0 +1,198 @@
+import math
+import time
+from config import (
+    LAYOUT_TIME_BUDGET, LAYOUT_MAX_ITERATIONS, LAYOUT_TOLERANCE,
+    LAYOUT_SCALING_RATIO, LAYOUT_GRAVITY, LAYOUT_LEAF_SIZE
+)
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+nx = lazy_import("networkx")
+
+NEIGHBOUR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+layout_engines = {}
+
+
+def register_layout_engine(name, function):
+    layout_engines[name] = function
+
+
+def spring_layout(num_nodes, edges, time_budget):
+    G = nx.Graph()
+    G.add_nodes_from(range(num_nodes))
+    G.add_edges_from(edges.tolist())
+
+    k = 10 + (num_nodes / 10)
+    iterations = 100 + (num_nodes * 2)
+
+    pos = nx.spring_layout(G, k=k, iterations=iterations, seed=42)
+    return np.array([pos[index] for index in range(num_nodes)], dtype=float).reshape(-1, 2)
+
+
+def get_cells(positions, low, width, grid):
+    cells = np.floor((positions - low) / width * grid).astype(np.int64)
+    return np.clip(cells, 0, grid - 1)
+
+
+def get_tree_depth(num_nodes):
+    return max(1, min(12, math.ceil(math.log(max(num_nodes / LAYOUT_LEAF_SIZE, 1), 4))))
+
+
+def add_pair_forces(forces, source, target, delta, strength):
+    distance2 = np.maximum((delta ** 2).sum(axis=1), 1e-9)
+    scaled = delta * (strength / distance2)[:, None]
+    forces[:, 0] += np.bincount(source, weights=scaled[:, 0], minlength=len(forces))
+    forces[:, 1] += np.bincount(source, weights=scaled[:, 1], minlength=len(forces))
+    if target is not None:
+        forces[:, 0] -= np.bincount(target, weights=scaled[:, 0], minlength=len(forces))
+        forces[:, 1] -= np.bincount(target, weights=scaled[:, 1], minlength=len(forces))
+
+
+def far_field_repulsion(positions, mass, low, width, depth, forces):
+    # Every pair of nodes is counted once: at the coarsest level where their
+    # cells stop being adjacent, the node sees the other cell's centre of mass.
+    num_nodes = len(positions)
+    nodes = np.arange(num_nodes)
+    block = np.arange(6)
+    block_x = np.repeat(block, 6)
+    block_y = np.tile(block, 6)
+
+    for level in range(2, depth + 1):
+        grid = 1 << level
+        cells = get_cells(positions, low, width, grid)
+        cell_ids = cells[:, 0] * grid + cells[:, 1]
+        cell_mass = np.bincount(cell_ids, weights=mass, minlength=grid * grid)
+        occupied = cell_mass > 0
+        center_x = np.bincount(cell_ids, weights=mass * positions[:, 0], minlength=grid * grid)
+        center_y = np.bincount(cell_ids, weights=mass * positions[:, 1], minlength=grid * grid)
+        center_x[occupied] /= cell_mass[occupied]
+        center_y[occupied] /= cell_mass[occupied]
+
+        origin = (cells // 2 - 1) * 2
+        other_x = origin[:, 0:1] + block_x
+        other_y = origin[:, 1:2] + block_y
+        valid = (other_x >= 0) & (other_x < grid) & (other_y >= 0) & (other_y < grid)
+        valid &= (np.abs(other_x - cells[:, 0:1]) > 1) | (np.abs(other_y - cells[:, 1:2]) > 1)
+        source = np.broadcast_to(nodes[:, None], valid.shape)[valid]
+        other = (other_x * grid + other_y)[valid]
+        keep = occupied[other]
+        source, other = source[keep], other[keep]
+
+        delta = positions[source] - np.column_stack([center_x[other], center_y[other]])
+        add_pair_forces(forces, source, None, delta, LAYOUT_SCALING_RATIO * mass[source] * cell_mass[other])
+
+
+def near_field_repulsion(positions, mass, low, width, depth, forces):
+    grid = 1 << depth
+    cells = get_cells(positions, low, width, grid)
+    cell_ids = cells[:, 0] * grid + cells[:, 1]
+    order = np.argsort(cell_ids, kind='stable')
+    counts = np.bincount(cell_ids, minlength=grid * grid)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    for dx, dy in NEIGHBOUR_OFFSETS:
+        other_x, other_y = cells[:, 0] + dx, cells[:, 1] + dy
+        inside = (other_x >= 0) & (other_x < grid) & (other_y >= 0) & (other_y < grid)
+        source_nodes = np.nonzero(inside)[0]
+        other = other_x[inside] * grid + other_y[inside]
+        sizes = counts[other]
+        total = int(sizes.sum())
+        if not total:
+            continue
+        source = np.repeat(source_nodes, sizes)
+        offsets = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        target = order[np.repeat(starts[other], sizes) + offsets]
+        distinct = source != target
+        source, target = source[distinct], target[distinct]
+
+        delta = positions[source] - positions[target]
+        add_pair_forces(forces, source, None, delta, LAYOUT_SCALING_RATIO * mass[source] * mass[target])
+
+
+def forceatlas2_layout(num_nodes, edges, time_budget):
+    """ForceAtlas2 with Barnes-Hut style repulsion over a quadtree of grid levels.
+
+    Stops once the mean step falls below ``LAYOUT_TOLERANCE`` of the layout's
+    spread, after ``LAYOUT_MAX_ITERATIONS`` or when ``time_budget`` seconds
+    have passed, whichever comes first.
+    """
+    started = time.perf_counter()
+    generator = np.random.RandomState(42)
+    positions = generator.uniform(-1, 1, size=(num_nodes, 2)) * math.sqrt(max(num_nodes, 1))
+    if num_nodes < 2:
+        return positions
+
+    degrees = np.bincount(edges.ravel(), minlength=num_nodes) if len(edges) else np.zeros(num_nodes)
+    mass = degrees + 1.0
+    depth = get_tree_depth(num_nodes)
+    previous_forces = np.zeros_like(positions)
+    speed, speed_efficiency = 1.0, 1.0
+    jitter_tolerance = 1.0
+
+    for _ in range(LAYOUT_MAX_ITERATIONS):
+        forces = np.zeros_like(positions)
+        low = positions.min(axis=0)
+        width = max(float((positions.max(axis=0) - low).max()), 1e-9) * (1 + 1e-9)
+
+        far_field_repulsion(positions, mass, low, width, depth, forces)
+        near_field_repulsion(positions, mass, low, width, depth, forces)
+
+        if len(edges):
+            delta = positions[edges[:, 1]] - positions[edges[:, 0]]
+            add_pair_forces(forces, edges[:, 0], edges[:, 1], delta, (delta ** 2).sum(axis=1))
+
+        distance = np.maximum(np.sqrt((positions ** 2).sum(axis=1)), 1e-9)
+        forces -= positions * (LAYOUT_GRAVITY * mass / distance)[:, None]
+
+        # Adaptive speed from the ForceAtlas2 paper: nodes that oscillate
+        # (swing) slow down, nodes that keep their direction (traction) speed up.
+        swinging = mass * np.sqrt(((forces - previous_forces) ** 2).sum(axis=1))
+        traction = mass * np.sqrt(((forces + previous_forces) ** 2).sum(axis=1)) / 2
+        total_swinging, total_traction = swinging.sum(), max(traction.sum(), 1e-9)
+
+        estimated_jitter = 0.05 * math.sqrt(num_nodes)
+        jitter = jitter_tolerance * max(math.sqrt(estimated_jitter),
+                                        min(10.0, estimated_jitter * total_traction / num_nodes ** 2))
+        if total_swinging / total_traction > 2.0:
+            if speed_efficiency > 0.05:
+                speed_efficiency *= 0.5
+            jitter = max(jitter, jitter_tolerance)
+        target_speed = jitter * speed_efficiency * total_traction / max(total_swinging, 1e-9)
+        if total_swinging > jitter * total_traction:
+            if speed_efficiency > 0.05:
+                speed_efficiency *= 0.7
+        elif speed < 1000:
+            speed_efficiency *= 1.3
+        speed = speed + min(target_speed - speed, 0.5 * speed)
+
+        steps = forces * (speed / (1 + np.sqrt(speed * swinging)))[:, None]
+        positions += steps
+        previous_forces = forces
+
+        spread = max(float(positions.std(axis=0).max()), 1e-9)
+        if np.sqrt((steps ** 2).sum(axis=1)).mean() < LAYOUT_TOLERANCE * spread:
+            break
+        if time.perf_counter() - started > time_budget:
+            break
+
+    return positions
+
+
+def rescale(positions):
+    if not len(positions):
+        return positions
+    positions = positions - positions.mean(axis=0)
+    extent = np.abs(positions).max()
+    return positions / extent if extent > 0 else positions
+
+
+def compute_layout(node_ids, edge_pairs, engine, time_budget=LAYOUT_TIME_BUDGET):
+    """Return ``{node_id: (x, y)}`` with coordinates scaled into [-1, 1]."""
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    edges = np.array([(index[source], index[target]) for source, target in edge_pairs], dtype=np.int64).reshape(-1, 2)
+    positions = rescale(layout_engines[engine](len(node_ids), edges, time_budget))
+    return {node_id: (float(x), float(y)) for node_id, (x, y) in zip(node_ids, positions.tolist())}
+
+
+register_layout_engine("spring", spring_layout)
+register_layout_engine("forceatlas2", forceatlas2_layout)
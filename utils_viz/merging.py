@@ -0,0 +1,69 @@
+def build_automaton(patterns):
+    goto = [{}]
+    terminal = [-1]
+
+    for index, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                terminal.append(-1)
+            state = next_state
+        terminal[state] = index
+
+    fail = [0] * len(goto)
+    dict_link = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for char, child in goto[state].items():
+            link = fail[state]
+            while link and char not in goto[link]:
+                link = fail[link]
+            link = goto[link].get(char, 0)
+            fail[child] = link
+            dict_link[child] = link if link and terminal[link] >= 0 else dict_link[link]
+            queue.append(child)
+
+    return goto, fail, terminal, dict_link
+
+def find_contained(automaton, text):
+    goto, fail, terminal, dict_link = automaton
+    found = set()
+    if terminal[0] >= 0:
+        found.add(terminal[0])
+
+    state = 0
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+
+        match = state if terminal[state] >= 0 else dict_link[state]
+        while match:
+            found.add(terminal[match])
+            match = dict_link[match]
+
+    return found
+
+def merge_contained_nodes(nodes):
+    """Map each node to the first node in ``nodes`` that contains it as a substring.
+
+    ``nodes`` must be sorted longest first. The mapping is filled in the same
+    order as the pairwise scan it replaces, so the order of ``merged_parts``
+    built from it does not change.
+    """
+    automaton = build_automaton(nodes)
+    merged_mapping = {}
+
+    for rank, node in enumerate(nodes):
+        contained = find_contained(automaton, node)
+        contained.discard(rank)
+        for index in sorted(contained):
+            existing = nodes[index]
+            if existing not in merged_mapping:
+                merged_mapping[existing] = node
+
+    return merged_mapping
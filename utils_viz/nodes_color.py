@@ -13,15 +13,37 @@ def interpolate_color(min_color, max_color, normalized_value):
     b = min_b + (max_b - min_b) * normalized_value
     return rgb_to_hex((int(r), int(g), int(b)))
 
-def calculate_node_style(degree, min_degree, max_degree, min_color, max_color, avg_size):
-    normalized_degree = (degree - min_degree) / (max_degree - min_degree) if max_degree > min_degree else 0
-    size = avg_size * (1 + normalized_degree)
-    color = interpolate_color(min_color, max_color, normalized_degree)
-    border_color = interpolate_color(min_color, max_color, normalized_degree * 0.8)
-    return size, color, border_color
+def map_degree(low, high, min_degree, max_degree):
+    return f"mapData(degree, {min_degree}, {max_degree}, {low}, {high})"
 
-def calculate_edge_style(source_degree, target_degree, min_degree, max_degree, min_color, max_color):
-    avg_degree = (source_degree + target_degree) / 2
-    normalized_degree = (avg_degree - min_degree) / (max_degree - min_degree) if max_degree > min_degree else 0
-    color = interpolate_color(min_color, max_color, normalized_degree)
-    return color
\ No newline at end of file
+def build_stylesheet(min_degree, max_degree, min_color, max_color, avg_size, text_size, edge_thickness):
+    # Nodes and edges carry their degree, so Cytoscape maps it to colour and
+    # size in the browser and a restyle never touches the graph itself.
+    border_max_color = interpolate_color(min_color, max_color, 0.8)
+    return [
+        {
+            'selector': 'node',
+            'style': {
+                'content': 'data(label)',
+                'font-size': f"{text_size}px",
+                'background-color': map_degree(min_color, max_color, min_degree, max_degree),
+                'width': map_degree(avg_size, avg_size * 2, min_degree, max_degree),
+                'height': map_degree(avg_size, avg_size * 2, min_degree, max_degree),
+                'border-color': map_degree(min_color, border_max_color, min_degree, max_degree),
+                'border-width': '2px',
+                'text-halign': 'center',
+                'text-valign': 'center',
+                'font-family': 'Helvetica'
+            }
+        },
+        {
+            'selector': 'edge',
+            'style': {
+                'line-color': map_degree(min_color, max_color, min_degree, max_degree),
+                'width': f'{edge_thickness}',
+                'target-arrow-shape': 'triangle',
+                'target-arrow-color': map_degree(min_color, max_color, min_degree, max_degree),
+                'font-family': 'Helvetica'
+            }
+        }
+    ]